@@ -0,0 +1,112 @@
+"""
+LLM Response Cache
+Content-addressed cache for agent LLM calls, shared with the Lambda worker
+through the llm_cache table (same key format: sha256 of model, params, prompt)
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))  # seconds
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+
+_memory: "OrderedDict[str, tuple]" = OrderedDict()
+_stats: Counter = Counter()
+
+def cache_key(model: str, params: Dict, prompt: str) -> str:
+    payload = json.dumps({"model": model, "params": params, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters for this process, keyed '<node>.<event>'"""
+    return dict(_stats)
+
+def _memory_get(key: str) -> Optional[str]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    expires_at, content = entry
+    if expires_at < time.time():
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return content
+
+def _memory_put(key: str, content: str):
+    _memory[key] = (time.time() + LLM_CACHE_TTL, content)
+    _memory.move_to_end(key)
+    while len(_memory) > LLM_CACHE_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+def _db_get(key: str) -> Optional[str]:
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                UPDATE llm_cache SET hits = hits + 1, last_hit_at = NOW()
+                WHERE cache_key = :key AND expires_at > NOW()
+                RETURNING response
+            """), {"key": key}).fetchone()
+            conn.commit()
+        return row.response if row else None
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache lookup failed: {e}")
+        return None
+
+def _db_put(key: str, model: str, node: str, content: str):
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("""
+                INSERT INTO llm_cache (cache_key, model, node, response, created_at, expires_at)
+                VALUES (:key, :model, :node, :response, NOW(), NOW() + make_interval(secs => :ttl))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response, created_at = NOW(), expires_at = EXCLUDED.expires_at
+            """), {"key": key, "model": model, "node": node, "response": content, "ttl": LLM_CACHE_TTL})
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache store failed: {e}")
+
+async def cached_ainvoke(llm, prompt: str, node: str, enabled: bool = True, validate=None) -> str:
+    """
+    Returns the text of llm.ainvoke(prompt), served from the cache when enabled.
+    Only responses that pass `validate` (if given) are stored.
+    """
+    if not enabled:
+        response = await llm.ainvoke(prompt)
+        return response.content
+
+    params = {"temperature": getattr(llm, "temperature", None), "max_tokens": getattr(llm, "max_tokens", None)}
+    key = cache_key(llm.model_name, params, prompt)
+
+    content = _memory_get(key)
+    if content is not None:
+        _stats[f"{node}.memory_hits"] += 1
+        return content
+    content = await asyncio.to_thread(_db_get, key)
+    if content is not None:
+        _stats[f"{node}.db_hits"] += 1
+        _memory_put(key, content)
+        return content
+    _stats[f"{node}.misses"] += 1
+
+    response = await llm.ainvoke(prompt)
+    if response.content:
+        try:
+            if validate:
+                validate(response.content)
+        except Exception:
+            return response.content
+        _memory_put(key, response.content)
+        _stats[f"{node}.stores"] += 1
+        await asyncio.to_thread(_db_put, key, llm.model_name, node, response.content)
+    return response.content
@@ -8,11 +8,25 @@ from langchain_openai import ChatOpenAI
 import json
 from dotenv import load_dotenv
 
+from agents.llm_cache import cached_ainvoke
+
 load_dotenv()
 
 # Use GPT-4 for high-quality title generation
 llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0.8, api_key=os.getenv("OPENAI_API_KEY"))
 
+# Off by default: at temperature 0.8 users expect fresh ideas for a repeated description
+TITLE_LLM_CACHE_ENABLED = os.getenv("TITLE_LLM_CACHE_ENABLED", "false").lower() == "true"
+
+def _parse_titles(content: str) -> List[str]:
+    content = content.strip()
+    
+    # Clean up markdown code blocks if present
+    if content.startswith("```"):
+        content = content.replace("```json", "").replace("```", "").strip()
+    
+    return json.loads(content)
+
 async def generate_titles(description: str, count: int = 1) -> List[str]:
     """
     Generate multiple distinct article titles from a description.
@@ -43,14 +57,10 @@ Return ONLY a JSON array of title strings, nothing else:
 """
     
     try:
-        response = await llm.ainvoke(prompt)
-        content = response.content.strip()
-        
-        # Clean up markdown code blocks if present
-        if content.startswith("```"):
-            content = content.replace("```json", "").replace("```", "").strip()
-        
-        titles = json.loads(content)
+        content = await cached_ainvoke(
+            llm, prompt, "titles", enabled=TITLE_LLM_CACHE_ENABLED, validate=_parse_titles
+        )
+        titles = _parse_titles(content)
         
         # Ensure we got the right number
         if len(titles) != count:
@@ -7,24 +7,84 @@ import logging
 logger = logging.getLogger(__name__)
 
 IS_LOCAL = os.getenv("LOCAL_DEV", "true").lower() == "true"
+# Articles per grouped job (one shared research pass each)
+GROUP_MAX_ARTICLES = int(os.getenv("GROUP_MAX_ARTICLES", "5"))
 LOCAL_LAMBDA_URL = "http://host.docker.internal:9000/2015-03-31/functions/function/invocations"
 async def trigger_worker(
     article_id: str, 
     query: str, 
     category: str, 
     target_length: int = 1500, 
-    source_count: int = 5
+    source_count: int = 5,
+    interactive: bool = False
 ) -> bool:
     payload = {
         "article_id": article_id,
         "query": query,
         "category": category,
         "target_length": target_length,
-        "source_count": source_count
+        "source_count": source_count,
+        # Interactive jobs let the worker overlap outline streaming and writing
+        "interactive": interactive
     }
 
     logger.info(f"🚀 Enqueueing Article Job: {article_id}")
-    
+    return await _dispatch(article_id, payload)
+
+async def trigger_rewrite(
+    article_id: str,
+    query: str,
+    category: str,
+    target_length: int,
+    tone: str = None
+) -> bool:
+    """Writer-only job: the worker reuses the article's stored brief and sources"""
+    payload = {
+        "article_id": article_id,
+        "query": query,
+        "category": category,
+        "target_length": target_length,
+        "mode": "rewrite",
+        "tone": tone
+    }
+
+    logger.info(f"✍️ Enqueueing Rewrite Job: {article_id}")
+    return await _dispatch(article_id, payload)
+
+async def trigger_group(
+    articles: list,
+    category: str,
+    source_count: int = 5
+) -> bool:
+    """
+    Enqueues closely related articles (e.g. titles from one description or
+    campaign) as grouped jobs: the worker researches once per group and writes
+    every article from that research. `articles` holds dicts with article_id,
+    query and target_length.
+    """
+    if len(articles) == 1:
+        item = articles[0]
+        return await trigger_worker(item["article_id"], item["query"], category, item["target_length"], source_count)
+
+    success = True
+    for start in range(0, len(articles), GROUP_MAX_ARTICLES):
+        group = articles[start:start + GROUP_MAX_ARTICLES]
+        lead = group[0]
+        payload = {
+            "article_id": lead["article_id"],
+            "query": lead["query"],
+            "category": category,
+            "target_length": lead["target_length"],
+            "source_count": source_count,
+            "mode": "group",
+            "articles": group
+        }
+
+        logger.info(f"🧬 Enqueueing Grouped Job: {len(group)} articles (lead {lead['article_id']})")
+        success = await _dispatch(lead["article_id"], payload) and success
+    return success
+
+async def _dispatch(article_id: str, payload: dict) -> bool:
     if IS_LOCAL:
         # LOCAL: Call Lambda directly with raw payload
         try:
@@ -162,6 +162,8 @@ class SourceContent(Base):
     title = Column(String(500))
     full_content = Column(Text)
     source_origin = Column(String(100))
+    raw_content_chars = Column(Integer, nullable=True)
+    extracted_content_chars = Column(Integer, nullable=True)
     
     article = relationship("Article", back_populates="sources")
 
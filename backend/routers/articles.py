@@ -8,7 +8,7 @@ from database import get_db
 from dependencies import get_current_user
 import models
 import schemas
-from lambda_trigger import retry_article_job
+from lambda_trigger import retry_article_job, trigger_rewrite
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -140,6 +140,50 @@ async def retry_article(
     else:
         raise HTTPException(status_code=500, detail="Failed to queue retry")
 
+@router.post("/{article_id}/regenerate", response_model=schemas.ArticleResponse)
+async def regenerate_article(
+    article_id: uuid.UUID,
+    request: schemas.ArticleRegenerateRequest,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Rewrites the article from its stored research and brief (no new search/scrape/analysis)"""
+    article = db.query(models.Article).filter(
+        models.Article.id == article_id,
+        models.Article.user_id == current_user.id
+    ).first()
+    
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+    
+    if article.status in ["queued", "researching", "scraping", "writing"]:
+        raise HTTPException(status_code=400, detail="Article is already being generated")
+    
+    has_brief = db.query(models.SEOBrief).filter(models.SEOBrief.article_id == article.id).first()
+    if not has_brief:
+        raise HTTPException(status_code=400, detail="No stored research for this article, retry a full generation instead")
+    
+    target_length = request.target_length or article.target_length
+    # Queued before dispatch, so the worker never sees the job before the status
+    previous_status = article.status
+    article.status = "queued"
+    db.commit()
+    
+    success = await trigger_rewrite(
+        str(article.id), article.raw_query, article.category, target_length, request.tone
+    )
+    
+    if success:
+        article.target_length = target_length
+        article.error_message = None
+        db.commit()
+        db.refresh(article)
+        return article
+    else:
+        article.status = previous_status
+        db.commit()
+        raise HTTPException(status_code=500, detail="Failed to queue rewrite")
+
 @router.patch("/{article_id}")
 def update_article(
     article_id: uuid.UUID,
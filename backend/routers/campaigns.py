@@ -9,14 +9,14 @@ from dependencies import get_current_user
 import models
 import schemas
 from services import campaign_service, credit_service
-from lambda_trigger import trigger_worker
+from lambda_trigger import trigger_group
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 logger = logging.getLogger(__name__)
 
-async def trigger_worker_task(article_id: str, query: str, category: str, target_length: int, source_count: int):
+async def trigger_group_task(articles: list, category: str, source_count: int):
     try:
-        await trigger_worker(article_id, query, category, target_length, source_count)
+        await trigger_group(articles, category, source_count)
     except Exception as e:
         logger.error(f"Failed to trigger worker: {e}")
 
@@ -37,7 +37,7 @@ async def create_campaign(
     campaign = campaign_service.create_campaign(db, current_user, campaign_data)
     
     articles = await campaign_service.generate_first_batch(
-        db, campaign, current_user, background_tasks, trigger_worker_task
+        db, campaign, current_user, background_tasks, trigger_group_task
     )
     
     logger.info(f"Campaign {campaign.id} created with {len(articles)} articles")
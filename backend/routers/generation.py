@@ -8,7 +8,7 @@ from database import get_db
 from dependencies import get_current_user
 import models
 import schemas
-from lambda_trigger import trigger_worker
+from lambda_trigger import trigger_worker, trigger_group
 from agents.title_agent import generate_titles
 
 router = APIRouter(prefix="/generate", tags=["generation"])
@@ -19,11 +19,18 @@ async def trigger_worker_task(payload: dict):
     try:
         await trigger_worker(
             payload["article_id"], payload["query"], payload["category"],
-            payload["target_length"], payload["source_count"]
+            payload["target_length"], payload["source_count"],
+            interactive=payload.get("interactive", False)
         )
     except Exception as e:
         logger.error(f"❌ Background Trigger Failed: {e}")
 
+async def trigger_group_task(articles: list, category: str, source_count: int):
+    try:
+        await trigger_group(articles, category, source_count)
+    except Exception as e:
+        logger.error(f"❌ Background Group Trigger Failed: {e}")
+
 @router.post("", response_model=schemas.ArticleResponse)
 async def generate_article(
     request: schemas.ArticleCreateRequest, 
@@ -58,7 +65,7 @@ async def generate_article(
     payload = {
         "article_id": str(new_article.id), "query": new_article.raw_query,
         "category": new_article.category, "target_length": new_article.target_length,
-        "source_count": new_article.source_count
+        "source_count": new_article.source_count, "interactive": True
     }
     background_tasks.add_task(trigger_worker_task, payload)
     return new_article
@@ -109,6 +116,8 @@ async def generate_batch_articles(
         raise HTTPException(status_code=400, detail="Some titles not found")
     
     created_articles = []
+    # Titles generated from the same description share a topic
+    related = {}
     
     for title_obj in titles:
         new_article = models.Article(
@@ -126,19 +135,27 @@ async def generate_batch_articles(
         )
         db.add(new_article)
         created_articles.append(new_article)
+        related.setdefault(title_obj.description, []).append(new_article)
     
     db.commit()
     
-    for article in created_articles:
-        db.refresh(article)
-        payload = {
-            "article_id": str(article.id),
-            "query": article.raw_query,
-            "category": article.category,
-            "target_length": article.target_length,
-            "source_count": article.source_count
-        }
-        background_tasks.add_task(trigger_worker_task, payload)
+    # Related titles share one research pass per group; the rest run on their own
+    for articles in related.values():
+        jobs = []
+        for article in articles:
+            db.refresh(article)
+            jobs.append({
+                "article_id": str(article.id),
+                "query": article.raw_query,
+                "target_length": article.target_length
+            })
+        if len(jobs) > 1:
+            background_tasks.add_task(trigger_group_task, jobs, request.category, request.source_count)
+        else:
+            background_tasks.add_task(
+                trigger_worker_task,
+                {**jobs[0], "category": request.category, "source_count": request.source_count}
+            )
     
     logger.info(f"✅ Created {len(created_articles)} articles and queued")
     
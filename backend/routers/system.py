@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends
 from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
+from database import get_db
 from dependencies import get_current_user
 import models
 from lambda_trigger import get_queue_statistics
+from agents.llm_cache import get_cache_stats
 
 router = APIRouter(tags=["system"])
 
@@ -19,4 +23,28 @@ async def health_check():
 @router.get("/queue/stats")
 async def get_queue_stats(current_user: models.User = Depends(get_current_user)):
     stats = await get_queue_statistics()
-    return {"queue_name": "article-generation-queue", **stats}
\ No newline at end of file
+    return {"queue_name": "article-generation-queue", **stats}
+
+@router.get("/llm-cache/stats")
+def get_llm_cache_stats(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # The workers' counters live in their own containers; the table's hit
+    # counts cover every process that shares the cache
+    rows = db.execute(text("""
+        SELECT COALESCE(node, 'unknown') AS node,
+               COUNT(*) AS entries,
+               COUNT(*) FILTER (WHERE expires_at > NOW()) AS live_entries,
+               COALESCE(SUM(hits), 0) AS db_hits
+        FROM llm_cache
+        GROUP BY COALESCE(node, 'unknown')
+        ORDER BY node
+    """)).fetchall()
+    return {
+        "llm_cache": {
+            row.node: {"entries": row.entries, "live_entries": row.live_entries, "db_hits": row.db_hits}
+            for row in rows
+        },
+        "backend_process": get_cache_stats()
+    }
\ No newline at end of file
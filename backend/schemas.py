@@ -15,6 +15,10 @@ class ArticleCreateRequest(BaseModel):
     class Config:
         populate_by_name = True
 
+class ArticleRegenerateRequest(BaseModel):
+    target_length: Optional[int] = Field(default=None, ge=300, le=10000)
+    tone: Optional[str] = Field(default=None, max_length=100)
+
 class UserStats(BaseModel):
     total: int
     scheduled: int
@@ -26,6 +30,8 @@ class SourceResponse(BaseModel):
     url: str
     title: Optional[str]
     source_origin: Optional[str]
+    raw_content_chars: Optional[int] = None
+    extracted_content_chars: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -70,16 +70,17 @@ async def generate_first_batch(db: Session, campaign: Campaign, user: User, back
     campaign.last_run_at = datetime.utcnow()
     db.commit()
     
+    # All of a campaign's titles come from one topic: research them once as a group
+    group = []
     for article in articles_created:
         db.refresh(article)
-        background_tasks.add_task(
-            trigger_func,
-            str(article.id),
-            article.raw_query,
-            article.category,
-            article.target_length,
-            article.source_count
-        )
+        group.append({
+            "article_id": str(article.id),
+            "query": article.raw_query,
+            "target_length": article.target_length
+        })
+    if group:
+        background_tasks.add_task(trigger_func, group, campaign.category, campaign.source_count)
     
     return articles_created
 
@@ -2,7 +2,7 @@ from celery_app import celery_app
 from database import DatabaseSession
 from models import Campaign, Article, User
 from services import campaign_service, credit_service
-from lambda_trigger import trigger_worker
+from lambda_trigger import trigger_group
 from agents.title_agent import generate_titles
 from datetime import datetime, date, time
 from sqlalchemy.exc import OperationalError
@@ -143,22 +143,23 @@ def process_daily_campaigns(self):
                     campaign.last_run_at = datetime.utcnow()
                     db.commit()
                     
-                    # Trigger workers for created articles
-                    for article in articles_created:
+                    # Trigger one grouped job: the day's titles share a single research pass
+                    if articles_created:
                         try:
-                            asyncio.run(trigger_worker(
-                                str(article.id),
-                                article.raw_query,
-                                article.category,
-                                article.target_length,
-                                article.source_count
+                            asyncio.run(trigger_group(
+                                [{
+                                    "article_id": str(article.id),
+                                    "query": article.raw_query,
+                                    "target_length": article.target_length
+                                } for article in articles_created],
+                                campaign.category,
+                                campaign.source_count
                             ))
                         except Exception as worker_error:
+                            # Don't fail the entire campaign if the worker trigger fails
                             logger.error(
-                                f"❌ Failed to trigger worker for article {article.id}: {worker_error}"
+                                f"❌ Failed to trigger worker for campaign {campaign.id}: {worker_error}"
                             )
-                            # Don't fail the entire campaign if one worker trigger fails
-                            continue
                     
                     total_processed += 1
                     total_articles_created += len(articles_created)
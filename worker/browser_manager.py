@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+BROWSER_ARGS = [
+    f"--user-agent={USER_AGENT}",
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-web-security",
+    "--disable-features=IsolateOrigins,site-per-process",
+    "--ignore-certificate-errors"
+]
+
+class BrowserManager:
+    """
+    Keeps one Chromium instance alive across warm Lambda invocations.
+    Callers borrow isolated contexts; the browser is health-checked on every
+    borrow, relaunched after a crash and recycled after max_uses contexts.
+    """
+
+    def __init__(self, headless: bool = True, max_uses: int = None):
+        self.headless = headless
+        self.max_uses = max_uses or Config.BROWSER_MAX_USES
+        self._playwright = None
+        self._browser = None
+        self._loop = None
+        self._lock = None
+        self._lock_loop = None
+        self._uses = 0
+        self._active = 0
+        self._page_slots = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._page_slots = asyncio.Semaphore(Config.BROWSER_MAX_PAGES)
+            self._lock_loop = loop
+        return self._lock
+
+    async def _launch(self):
+        logger.info(f"🚀 Launching Chromium (Headless: {self.headless})...")
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=BROWSER_ARGS
+        )
+        self._loop = asyncio.get_running_loop()
+        self._uses = 0
+
+    async def _shutdown(self):
+        browser, playwright = self._browser, self._playwright
+        self._browser = None
+        self._playwright = None
+        self._uses = 0
+        if browser:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if playwright:
+            try:
+                await playwright.stop()
+            except Exception:
+                pass
+
+    async def get_browser(self):
+        """Returns a healthy browser, launching or relaunching it when needed."""
+        async with self._get_lock():
+            if self._browser is not None and self._loop is not asyncio.get_running_loop():
+                # Playwright objects are bound to the loop that created them
+                logger.warning("⚠️ Event loop changed since launch, discarding browser.")
+                self._browser = None
+                self._playwright = None
+            elif self._browser is not None and not self._browser.is_connected():
+                logger.warning("⚠️ Browser disconnected (crash?), relaunching...")
+                await self._shutdown()
+            elif self._browser is not None and self._uses >= self.max_uses and self._active == 0:
+                logger.info(f"♻️ Recycling browser after {self._uses} uses")
+                await self._shutdown()
+
+            if self._browser is None:
+                await self._launch()
+            return self._browser
+
+    @asynccontextmanager
+    async def context(self, **kwargs):
+        """Borrows a fresh browser context; it is closed when the block exits."""
+        kwargs.setdefault("user_agent", USER_AGENT)
+        browser = await self.get_browser()
+        try:
+            context = await browser.new_context(**kwargs)
+        except Exception as e:
+            logger.warning(f"⚠️ Browser unhealthy ({e}), relaunching...")
+            async with self._get_lock():
+                if self._browser is browser:
+                    await self._shutdown()
+            browser = await self.get_browser()
+            context = await browser.new_context(**kwargs)
+
+        self._uses += 1
+        self._active += 1
+        try:
+            yield context
+        finally:
+            self._active -= 1
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    @asynccontextmanager
+    async def page_slot(self):
+        """
+        Caps the pages open at once across every caller sharing this browser
+        (e.g. SQS records processed concurrently). Each caller holds at most
+        one slot at a time, so callers can't deadlock each other.
+        """
+        self._get_lock()
+        async with self._page_slots:
+            yield
+
+    async def close(self):
+        async with self._get_lock():
+            await self._shutdown()
+
+# Shared per Lambda container
+browser_manager = BrowserManager()
+
+_worker_loop = None
+
+def run_async(coro):
+    """
+    Runs a coroutine on an event loop that survives across warm invocations.
+    asyncio.run() would close the loop and strand the pooled browser with it.
+    """
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coro)
@@ -0,0 +1,85 @@
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_checkpointer = None
+_initialized = False
+
+def _postgres_conninfo(url: str) -> str:
+    """psycopg 3 wants a plain postgresql:// URL, without a SQLAlchemy driver suffix."""
+    _, rest = url.split("://", 1)
+    return f"postgresql://{rest}"
+
+async def _create_postgres_saver():
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    if Config.DB_EXTERNAL_POOLER:
+        # Transaction-mode poolers can't keep server-side prepared statements,
+        # and hold the server connections themselves: keep none idle here
+        pool = AsyncConnectionPool(
+            _postgres_conninfo(Config.DB_URL),
+            min_size=0,
+            max_size=Config.CHECKPOINT_POOL_SIZE,
+            max_idle=30,
+            kwargs={"autocommit": True, "prepare_threshold": None, "row_factory": dict_row},
+            open=False
+        )
+    else:
+        pool = AsyncConnectionPool(
+            _postgres_conninfo(Config.DB_URL),
+            max_size=Config.CHECKPOINT_POOL_SIZE,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False
+        )
+    await pool.open()
+    saver = AsyncPostgresSaver(pool)
+    # Creates/migrates LangGraph's checkpoint tables; a no-op once they exist
+    await saver.setup()
+    return saver
+
+async def _create_sqlite_saver():
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    conn = await aiosqlite.connect(Config.CHECKPOINT_SQLITE_PATH)
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    return saver
+
+async def get_checkpointer():
+    """
+    Returns the container's LangGraph checkpointer (created on first use), or
+    None when checkpointing is disabled or its backend is unavailable; the
+    graph then simply runs without resume support.
+    """
+    global _checkpointer, _initialized
+    if _initialized:
+        return _checkpointer
+    _initialized = True
+
+    backend = Config.CHECKPOINT_BACKEND
+    try:
+        if backend == "postgres":
+            _checkpointer = await _create_postgres_saver()
+        elif backend == "sqlite":
+            _checkpointer = await _create_sqlite_saver()
+        if _checkpointer is not None:
+            print(f"--- 💾 Graph checkpoints: {backend} ---")
+    except Exception as e:
+        logger.warning(f"⚠️ Checkpointer unavailable ({backend}), running without resume: {e}")
+        _checkpointer = None
+    return _checkpointer
+
+async def clear_checkpoint(thread_id: str):
+    """Drops a finished article's checkpoints so the tables don't grow without bound."""
+    checkpointer = await get_checkpointer()
+    if checkpointer is None or not hasattr(checkpointer, "adelete_thread"):
+        return
+    try:
+        await checkpointer.adelete_thread(thread_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not clear checkpoints for {thread_id}: {e}")
@@ -19,13 +19,150 @@ class Config:
     DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
     DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
     DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    # Set when DATABASE_URL points at PgBouncer / RDS Proxy in transaction mode:
+    # the external pooler owns the connections, so the worker keeps none open
+    DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "false").lower() == "true"
 
     # Google API (Custom Search)
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
     
     # API Usage Limits
-    DAILY_API_LIMIT = 95
+    DAILY_API_LIMIT = int(os.getenv("DAILY_API_LIMIT", "95"))
+    # Shared across containers: "postgres" (api_quota table) or "local" (this process only)
+    QUOTA_BACKEND = os.getenv("QUOTA_BACKEND", "postgres").lower()
+    # Calls a container claims from the shared quota at once
+    QUOTA_LEASE_BLOCK = int(os.getenv("QUOTA_LEASE_BLOCK", "5"))
+    QUOTA_TIMEZONE = os.getenv("QUOTA_TIMEZONE", "America/Los_Angeles")  # when the daily quota resets
+    # Shared token bucket: sustained calls per second (> 0) and burst size
+    QUOTA_RATE_PER_SECOND = float(os.getenv("QUOTA_RATE_PER_SECOND", "1"))
+    QUOTA_BURST = int(os.getenv("QUOTA_BURST", "10"))
+    QUOTA_MAX_WAIT = float(os.getenv("QUOTA_MAX_WAIT", "5"))  # seconds to wait for a token
+
+    # Search providers, in priority order: gnews, cse, google_scrape
+    SEARCH_PROVIDERS = [p.strip() for p in os.getenv("SEARCH_PROVIDERS", "gnews,cse").split(",") if p.strip()]
+    # sequential: next provider only when the previous found nothing
+    # hedge: next provider also starts once SEARCH_HEDGE_DELAY passes without enough results
+    # fanout: every provider at once
+    # cse takes its quota before the request, so a hedged or fanned-out call
+    # counts against DAILY_API_LIMIT even when it's cancelled
+    SEARCH_STRATEGY = os.getenv("SEARCH_STRATEGY", "sequential")
+    SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "3"))  # seconds
+    SEARCH_PROVIDER_TIMEOUT = float(os.getenv("SEARCH_PROVIDER_TIMEOUT", "20"))  # seconds
+    SEARCH_RESULTS_PER_PROVIDER = int(os.getenv("SEARCH_RESULTS_PER_PROVIDER", "5"))
+    
+    # Search result cache (in-process LRU + search_cache table), keyed by
+    # provider and normalized query. News goes stale fast, web results don't.
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_TTLS = {  # seconds
+        "gnews": int(os.getenv("SEARCH_CACHE_TTL_GNEWS", str(3 * 3600))),
+        "cse": int(os.getenv("SEARCH_CACHE_TTL_CSE", str(7 * 86400))),
+        "google_scrape": int(os.getenv("SEARCH_CACHE_TTL_GOOGLE_SCRAPE", str(86400))),
+    }
+    SEARCH_CACHE_MEMORY_ITEMS = int(os.getenv("SEARCH_CACHE_MEMORY_ITEMS", "256"))
+    SEARCH_CACHE_PRUNE_EVERY = int(os.getenv("SEARCH_CACHE_PRUNE_EVERY", "50"))  # stores between prunes
+
+    # Scraper concurrency
+    # Number of browser contexts scraping in parallel (1 = sequential)
+    SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "3"))
+    # Hard limit (seconds) for scraping a single URL in concurrent mode
+    SCRAPE_URL_TIMEOUT = int(os.getenv("SCRAPE_URL_TIMEOUT", "45"))
+    # Warm browser is relaunched after this many borrowed contexts
+    BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+    # Pages open at once across all jobs sharing the container's browser
+    BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "8"))
+    
+    # Lightweight rendering: skip resources that never contribute text
+    SCRAPE_BLOCK_RESOURCES = os.getenv("SCRAPE_BLOCK_RESOURCES", "true").lower() == "true"
+    SCRAPE_BLOCKED_RESOURCE_TYPES = set(
+        os.getenv("SCRAPE_BLOCKED_RESOURCE_TYPES", "image,media,font").split(",")
+    )
+    # Page readiness: content selector with this much text, or text stable for N ms
+    SCRAPE_READY_CONTENT_CHARS = int(os.getenv("SCRAPE_READY_CONTENT_CHARS", "1500"))
+    SCRAPE_READY_STABLE_MS = int(os.getenv("SCRAPE_READY_STABLE_MS", "750"))
+    SCRAPE_READY_MAX_MS = int(os.getenv("SCRAPE_READY_MAX_MS", "8000"))
+    
+    # HTTP-first fetching (Playwright is only used as a fallback)
+    HTTP_FETCH_ENABLED = os.getenv("HTTP_FETCH_ENABLED", "true").lower() == "true"
+    HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "10"))
+    # Pages with less extracted text than this are escalated to the browser
+    HTTP_MIN_CONTENT_CHARS = int(os.getenv("HTTP_MIN_CONTENT_CHARS", "1000"))
+    HTTP_MAX_BYTES = int(os.getenv("HTTP_MAX_BYTES", str(3 * 1024 * 1024)))
+    
+    # Google News links are resolved to publisher URLs without a browser
+    GNEWS_RESOLVER_ENABLED = os.getenv("GNEWS_RESOLVER_ENABLED", "true").lower() == "true"
+    GNEWS_RESOLVE_CONCURRENCY = int(os.getenv("GNEWS_RESOLVE_CONCURRENCY", "5"))
+    
+    # Scrape result cache (local /tmp tier + shared Postgres tier)
+    SCRAPE_CACHE_ENABLED = os.getenv("SCRAPE_CACHE_ENABLED", "true").lower() == "true"
+    SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", str(24 * 3600)))
+    SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR", "/tmp/scrape_cache")
+    # How long another worker may hold a URL before waiters fetch it themselves
+    SCRAPE_CACHE_LEASE_SECONDS = int(os.getenv("SCRAPE_CACHE_LEASE_SECONDS", "90"))
+    SCRAPE_CACHE_POLL_INTERVAL = float(os.getenv("SCRAPE_CACHE_POLL_INTERVAL", "1.0"))
+    SCRAPE_CACHE_PRUNE_EVERY = int(os.getenv("SCRAPE_CACHE_PRUNE_EVERY", "50"))  # stores between prunes
+    
+    # Analyzer input budget (tokens), split across sources by content size
+    ANALYZER_INPUT_TOKEN_BUDGET = int(os.getenv("ANALYZER_INPUT_TOKEN_BUDGET", "20000"))
+    ANALYZER_SOURCE_TOKEN_FLOOR = int(os.getenv("ANALYZER_SOURCE_TOKEN_FLOOR", "1000"))
+    ANALYZER_SOURCE_TOKEN_CAP = int(os.getenv("ANALYZER_SOURCE_TOKEN_CAP", "6000"))
+    # Only BM25-relevant passages (vs. title + category) are sent to the analyzer
+    ANALYZER_PASSAGE_SELECTION = os.getenv("ANALYZER_PASSAGE_SELECTION", "true").lower() == "true"
+    PASSAGE_TARGET_WORDS = int(os.getenv("PASSAGE_TARGET_WORDS", "120"))
+    
+    # Analyzer mode: "single" (one big prompt), "map_reduce" (parallel per-source
+    # extraction + outline from condensed notes) or "auto" (map_reduce for long,
+    # many-source articles)
+    ANALYZER_MODE = os.getenv("ANALYZER_MODE", "auto").lower()
+    ANALYZER_MAP_CONCURRENCY = int(os.getenv("ANALYZER_MAP_CONCURRENCY", "4"))
+    ANALYZER_MAP_REDUCE_MIN_SOURCES = int(os.getenv("ANALYZER_MAP_REDUCE_MIN_SOURCES", "3"))
+    ANALYZER_MAP_REDUCE_MIN_LENGTH = int(os.getenv("ANALYZER_MAP_REDUCE_MIN_LENGTH", "2500"))
+    
+    # Writer mode: "single" (one call), "sections" (level-1 outline sections
+    # written concurrently, then stitched) or "auto" (sections for long articles)
+    WRITER_MODE = os.getenv("WRITER_MODE", "auto").lower()
+    WRITER_SECTIONS_MIN_LENGTH = int(os.getenv("WRITER_SECTIONS_MIN_LENGTH", "2500"))
+    WRITER_SECTION_CONCURRENCY = int(os.getenv("WRITER_SECTION_CONCURRENCY", "8"))
+    
+    # Interactive jobs stream the analyzer reply and start section writers as
+    # soon as each outline section is complete
+    STREAMING_PIPELINE = os.getenv("STREAMING_PIPELINE", "true").lower() == "true"
+    STREAMING_EXPECTED_SECTIONS = int(os.getenv("STREAMING_EXPECTED_SECTIONS", "7"))
+    # Streamed sections are budgeted before the section count is known; when
+    # their total misses target_length by more than this share, the drafts are
+    # dropped and the writer node writes with exact budgets instead
+    STREAMING_MAX_LENGTH_DRIFT = float(os.getenv("STREAMING_MAX_LENGTH_DRIFT", "0.15"))
+    
+    # LLM response cache (in-process LRU + llm_cache table), opt-in per node:
+    # analyze, analyze_map, write, write_section, stitch
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_NODES = set(
+        n.strip() for n in os.getenv("LLM_CACHE_NODES", "analyze,analyze_map").split(",") if n.strip()
+    )
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))  # seconds
+    LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "128"))
+    LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "5000"))
+    LLM_CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", "50"))  # stores between prunes
+    
+    # LangGraph checkpoints keyed by article id, so retries resume at the
+    # failed node: "postgres" (durable across containers), "sqlite" or "none"
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "postgres").lower()
+    CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "/tmp/checkpoints.sqlite")
+    CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "4"))
+    CHECKPOINT_DELETE_ON_SUCCESS = os.getenv("CHECKPOINT_DELETE_ON_SUCCESS", "true").lower() == "true"
+    
+    # SQS records processed concurrently per invocation, and the OpenAI request
+    # rate shared by all of them
+    WORKER_RECORD_CONCURRENCY = int(os.getenv("WORKER_RECORD_CONCURRENCY", "3"))
+    LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "5"))
+    LLM_MAX_BURST = int(os.getenv("LLM_MAX_BURST", "10"))
+    
+    # Cross-source near-duplicate removal (MinHash/LSH over paragraphs)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    # Estimated Jaccard similarity at which two paragraphs count as duplicates
+    DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.8"))
+    # Sources with at least this share of duplicated text are dropped/replaced
+    DEDUP_SOURCE_DROP_RATIO = float(os.getenv("DEDUP_SOURCE_DROP_RATIO", "0.7"))
     
     # SQS Configuration (for local Lambda testing)
     SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
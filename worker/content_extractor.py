@@ -0,0 +1,241 @@
+import logging
+import re
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# Never visible text
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "head", "iframe", "canvas"}
+# Visible, but never part of the main content
+BOILERPLATE_TAGS = {"nav", "aside", "footer", "form", "button", "select", "dialog"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+PARAGRAPH_TAGS = {"p", "pre", "blockquote", "li", "td", "dd"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BLOCK_TAGS = PARAGRAPH_TAGS | HEADING_TAGS | {
+    "div", "section", "article", "main", "header", "ul", "ol", "dl", "dt",
+    "table", "tr", "figure", "figcaption"
+}
+
+NEGATIVE_RE = re.compile(
+    r"comment|footer|footnote|nav|menu|sidebar|side-bar|cookie|consent|banner|related|"
+    r"recommend|share|social|promo|sponsor|advert|\bads?\b|subscribe|newsletter|"
+    r"breadcrumb|popup|modal|masthead|widget|outbrain|taboola",
+    re.I
+)
+POSITIVE_RE = re.compile(r"article|body|content|entry|main|post|story|text|blog", re.I)
+
+# Paragraphs shorter than this carry too little signal to score or keep
+MIN_PARAGRAPH_CHARS = 25
+# Below this the extractor probably picked the wrong container
+MIN_EXTRACTED_CHARS = 300
+
+class _Node:
+    __slots__ = ("tag", "attrs", "parent", "children", "text_len", "link_len")
+
+    def __init__(self, tag: str, attrs: str, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.text_len = 0
+        self.link_len = 0
+
+class _TreeBuilder(HTMLParser):
+    """Builds a lightweight, forgiving element tree from (possibly malformed) HTML."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("root", "", None)
+        self.stack = [self.root]
+
+    def _open(self, tag, attrs):
+        top = self.stack[-1]
+        # Implicitly close <p> / <li> like a browser would
+        if (tag in BLOCK_TAGS and top.tag == "p") or (tag == "li" and top.tag == "li"):
+            self.stack.pop()
+            top = self.stack[-1]
+        node = _Node(tag, " ".join(v for k, v in attrs if k in ("class", "id") and v), top)
+        top.children.append(node)
+        return node
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self.stack[-1].children.append("\n")
+            return
+        self.stack.append(self._open(tag, attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self._open(tag, attrs)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+def _parse(html: str) -> _Node:
+    builder = _TreeBuilder()
+    try:
+        builder.feed(html)
+        builder.close()
+    except Exception as e:
+        logger.debug(f"HTML parse warning: {e}")
+    return builder.root
+
+def _text(node: _Node, skip: set = SKIP_TAGS) -> str:
+    """Concatenated text of a subtree (iterative, so deep pages can't hit the recursion limit)."""
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        elif item.tag not in skip:
+            stack.extend(reversed(item.children))
+    return " ".join(" ".join(parts).split())
+
+def _measure(root: _Node):
+    """Fills text_len and link_len for every node in one post-order pass."""
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(c for c in node.children if isinstance(c, _Node) and c.tag not in SKIP_TAGS)
+
+    for node in reversed(order):
+        for child in node.children:
+            if isinstance(child, str):
+                length = len(child.strip())
+                node.text_len += length
+                if node.tag == "a":
+                    node.link_len += length
+            elif child.tag not in SKIP_TAGS:
+                node.text_len += child.text_len
+                node.link_len += child.text_len if child.tag == "a" else child.link_len
+
+def _link_density(node: _Node) -> float:
+    return node.link_len / node.text_len if node.text_len else 1.0
+
+def _class_weight(node: _Node) -> int:
+    weight = 0
+    if node.attrs:
+        if NEGATIVE_RE.search(node.attrs):
+            weight -= 25
+        if POSITIVE_RE.search(node.attrs):
+            weight += 25
+    return weight
+
+def _blocks(root: _Node) -> list:
+    """Headings and paragraph-like blocks in document order, boilerplate subtrees excluded."""
+    blocks = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.tag in SKIP_TAGS or node.tag in BOILERPLATE_TAGS:
+            continue
+        if node.tag in PARAGRAPH_TAGS or node.tag in HEADING_TAGS:
+            blocks.append(node)
+            continue
+        # Text written directly into a <div> counts as a paragraph too
+        if node.tag == "div" and sum(len(c.strip()) for c in node.children if isinstance(c, str)) >= MIN_PARAGRAPH_CHARS:
+            blocks.append(node)
+            continue
+        stack.extend(reversed([c for c in node.children if isinstance(c, _Node)]))
+    return blocks
+
+def _is_within(node: _Node, containers: set) -> bool:
+    while node is not None:
+        if id(node) in containers:
+            return True
+        node = node.parent
+    return False
+
+def html_to_text(html: str) -> str:
+    """Returns the whitespace-normalized visible text of an HTML document."""
+    return _text(_parse(html))
+
+def extract_main_content(html: str, fallback_text: str = "") -> str:
+    """See _extract_from_tree; parses html first."""
+    return _extract_from_tree(_parse(html), fallback_text)
+
+def extract_page(html: str):
+    """
+    Parses html once and returns (visible page text, main content), the main
+    content falling back to the page text. CPU-bound on large pages, so async
+    callers should run it in a thread.
+    """
+    root = _parse(html)
+    page_text = _text(root)
+    return page_text, _extract_from_tree(root, fallback_text=page_text)
+
+def _extract_from_tree(root: _Node, fallback_text: str = "") -> str:
+    """
+    Extracts the main article text from HTML, readability style: paragraphs
+    score their parent (and half their grandparent) by length and commas, the
+    scores are weighted by class/id hints and link density, and the best
+    container plus strong siblings is kept. Returns headings and paragraphs
+    separated by blank lines (headings as Markdown). Falls back to
+    fallback_text (or the full page text) when nothing convincing is found.
+    """
+    _measure(root)
+    blocks = _blocks(root)
+
+    scores = {}
+    nodes = {}
+    for block in blocks:
+        if block.tag in HEADING_TAGS:
+            continue
+        text_len = block.text_len
+        if text_len < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + _text(block).count(",") + min(text_len // 100, 3)
+        for ancestor, share in ((block.parent, 1.0), (block.parent.parent if block.parent else None, 0.5)):
+            if ancestor is None:
+                continue
+            if id(ancestor) not in scores:
+                scores[id(ancestor)] = _class_weight(ancestor)
+                nodes[id(ancestor)] = ancestor
+            scores[id(ancestor)] += score * share
+
+    if not scores:
+        return fallback_text or _text(root)
+
+    for key, node in nodes.items():
+        scores[key] *= 1 - _link_density(node)
+
+    top_key = max(scores, key=scores.get)
+    top = nodes[top_key]
+    containers = {top_key}
+
+    # Articles are often split across sibling containers (e.g. around an ad slot)
+    threshold = max(10, scores[top_key] * 0.2)
+    if top.parent is not None:
+        for sibling in top.parent.children:
+            if isinstance(sibling, _Node) and scores.get(id(sibling), 0) >= threshold:
+                containers.add(id(sibling))
+
+    parts = []
+    for block in blocks:
+        if not _is_within(block, containers):
+            continue
+        text = _text(block)
+        if not text:
+            continue
+        if block.tag in HEADING_TAGS:
+            parts.append(f"{'#' * int(block.tag[1])} {text}")
+        elif len(text) >= MIN_PARAGRAPH_CHARS and _link_density(block) < 0.5:
+            parts.append(text)
+
+    extracted = "\n\n".join(parts)
+    if len(extracted) < MIN_EXTRACTED_CHARS:
+        return fallback_text or _text(root)
+    return extracted
@@ -0,0 +1,90 @@
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warning(f"⚠️ No tokenizer mapping for {model}, using o200k_base")
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    return len(_get_encoding(model).encode(text or "", disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cuts text to at most max_tokens, preferring to end on a paragraph boundary."""
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text or "", disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text or ""
+    truncated = encoding.decode(tokens[:max_tokens])
+    # Drop a trailing half paragraph if that loses less than a fifth of the slice
+    boundary = truncated.rfind("\n\n")
+    if boundary > len(truncated) * 0.8:
+        truncated = truncated[:boundary]
+    return truncated
+
+def allocate_budget(sizes: List[int], total: int, floor: int, cap: int) -> List[int]:
+    """
+    Splits a token budget across sources. Each source can use at most
+    min(size, cap); every source first gets up to `floor`, and the rest of
+    the budget is shared in proportion to what each source still has left.
+    """
+    demand = [min(size, cap) for size in sizes]
+    if sum(demand) <= total:
+        return demand
+
+    # Not even the floors fit: share the budget equally instead
+    base = [min(d, floor) for d in demand]
+    if sum(base) > total:
+        base = [0] * len(demand)
+        remaining_sources = sorted(range(len(demand)), key=lambda i: demand[i])
+        budget = total
+        for n, i in enumerate(remaining_sources):
+            share = budget // (len(demand) - n)
+            base[i] = min(demand[i], share)
+            budget -= base[i]
+        return base
+
+    remaining = total - sum(base)
+    extra = [d - b for d, b in zip(demand, base)]
+    extra_total = sum(extra)
+    return [b + (remaining * e // extra_total if extra_total else 0) for b, e in zip(base, extra)]
+
+def fit_sources_to_budget(
+    contents: List[str],
+    model: str = "gpt-4o-mini",
+    total: int = None,
+    floor: int = None,
+    cap: int = None
+) -> Tuple[List[str], Dict]:
+    """
+    Trims each source's text to its share of the analyzer input budget.
+    Returns the trimmed texts and a summary of the token accounting.
+    """
+    total = total or Config.ANALYZER_INPUT_TOKEN_BUDGET
+    floor = floor or Config.ANALYZER_SOURCE_TOKEN_FLOOR
+    cap = cap or Config.ANALYZER_SOURCE_TOKEN_CAP
+
+    sizes = [count_tokens(content, model) for content in contents]
+    allocation = allocate_budget(sizes, total, floor, cap)
+    trimmed = [
+        content if tokens >= size else truncate_to_tokens(content, tokens, model)
+        for content, size, tokens in zip(contents, sizes, allocation)
+    ]
+
+    meta = {
+        "input_token_budget": total,
+        "source_tokens_available": sizes,
+        "source_tokens_allocated": allocation,
+        "source_tokens_used": sum(min(size, tokens) for size, tokens in zip(sizes, allocation)),
+    }
+    return trimmed, meta
@@ -1,57 +1,276 @@
 import os
 import json
+import asyncio
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from config import Config
 
-def save_research_data(article_id: str, sources: list):
-    """Saves raw scraped content into the source_contents table."""
-    engine = create_engine(Config.DB_URL)
-    try:
-        with engine.connect() as conn:
-            for src in sources:
-                stmt = text("""
-                    INSERT INTO source_contents (id, article_id, url, title, full_content, source_origin)
-                    VALUES (gen_random_uuid(), :article_id, :url, :title, :content, :origin)
-                """)
-                conn.execute(stmt, {
-                    "article_id": article_id,
-                    "url": src['url'],
-                    "title": src['title'],
-                    "content": src.get('full_content', ''),
-                    "origin": src.get('source_origin', 'Search')
-                })
-            conn.commit()
-    except Exception as e:
-        print(f"Error saving research: {e}")
+_engine = None
+_async_engine = None
+_async_engine_loop = None
+# article id -> [(save task, sources)] still running in the background
+_pending_saves = {}
+
+def get_engine():
+    """
+    Returns the Lambda container's single engine (created lazily, reused across
+    warm invocations and shared by every thread). With DB_EXTERNAL_POOLER the
+    pooler in transaction mode hands out connections, so each checkout opens
+    and closes a pooler connection instead of holding Postgres connections.
+    """
+    global _engine
+    if _engine is None:
+        if Config.DB_EXTERNAL_POOLER:
+            _engine = create_engine(Config.DB_URL, poolclass=NullPool)
+        else:
+            _engine = create_engine(
+                Config.DB_URL,
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_recycle=Config.DB_POOL_RECYCLE,
+                pool_pre_ping=True
+            )
+    return _engine
+
+# Article states a job never needs to run again for (redelivered messages)
+FINISHED_STATUSES = ("completed", "scheduled", "posted")
 
-def finalize_article_in_db(article_id: str, content: str, seo_brief: dict):
-    """Updates the article and saves the brief."""
-    engine = create_engine(Config.DB_URL)
+def get_article_statuses(article_ids: list) -> dict:
+    """Returns {article_id: status} for the given article ids."""
+    if not article_ids:
+        return {}
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT id::text AS id, status FROM articles
+            WHERE id = ANY(CAST(:ids AS uuid[]))
+        """), {"ids": list(article_ids)}).fetchall()
+    return {row.id: row.status for row in rows}
+
+def claim_articles(article_ids: list) -> dict:
+    """
+    Marks every unfinished article as 'researching' and returns the statuses
+    they had before, in one round-trip ({article_id: status}; articles in
+    FINISHED_STATUSES are left untouched and should be skipped).
+    """
+    if not article_ids:
+        return {}
+    with get_engine().begin() as conn:
+        rows = conn.execute(text("""
+            WITH current AS (
+                SELECT id, status FROM articles
+                WHERE id = ANY(CAST(:ids AS uuid[]))
+            ), claimed AS (
+                UPDATE articles SET status = 'researching', updated_at = NOW()
+                FROM current
+                WHERE articles.id = current.id
+                  AND current.status <> 'researching'
+                  AND current.status <> ALL(CAST(:finished AS text[]))
+            )
+            SELECT id::text AS id, status FROM current
+        """), {"ids": list(article_ids), "finished": list(FINISHED_STATUSES)}).fetchall()
+    return {row.id: row.status for row in rows}
+
+def mark_articles_failed(errors: dict, mode: str = "generate"):
+    """
+    Records failed jobs ({article_id: error message}) in one UPDATE. A failed
+    rewrite leaves the previous article in place, so it goes back to the
+    status that article had: posted, scheduled or completed.
+    """
+    if not errors:
+        return
     try:
-        with engine.connect() as conn:
-            # 1. Save SEO Brief
+        with get_engine().begin() as conn:
             conn.execute(text("""
-                INSERT INTO seo_briefs (id, article_id, keywords, outline, strategy)
-                VALUES (gen_random_uuid(), :a_id, :keywords, :outline, :strategy)
+                UPDATE articles
+                SET status = CASE
+                        WHEN NOT CAST(:rewrite AS boolean) THEN 'failed'
+                        WHEN posted_at IS NOT NULL THEN 'posted'
+                        WHEN scheduled_at > NOW() THEN 'scheduled'
+                        ELSE 'completed'
+                    END,
+                    error_message = failed.error,
+                    updated_at = NOW()
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:errors AS text[])) AS failed(id, error)
+                WHERE articles.id = failed.id
             """), {
-                "a_id": article_id,
-                "keywords": json.dumps(seo_brief.get('keywords', [])),
-                "outline": json.dumps(seo_brief.get('detailed_outline', {})),
-                "strategy": seo_brief.get('strategy', '')
+                "rewrite": mode == "rewrite",
+                "ids": list(errors),
+                "errors": [str(error) for error in errors.values()]
             })
-            
-            # 2. Update Article Status
-            # Logic: If scheduled_at > now, status is 'scheduled', else 'completed'
-            conn.execute(text("""
-                UPDATE articles 
-                SET content = :content,
-                    status = CASE 
-                        WHEN scheduled_at > NOW() THEN 'scheduled' 
-                        ELSE 'completed' 
-                    END
-                WHERE id = :id
-            """), {"content": content, "id": article_id})
-            
-            conn.commit()
     except Exception as e:
-        print(f"Error finalizing: {e}")
\ No newline at end of file
+        print(f"Error marking articles failed: {e}")
+
+def _async_url(url: str) -> str:
+    _, rest = url.split("://", 1)
+    return f"postgresql+psycopg://{rest}"
+
+def get_async_engine():
+    """
+    Async (psycopg 3) engine for bulk writes that run alongside the pipeline.
+    Async connections are bound to an event loop, so the engine is
+    recreated if the loop ever changes (normally it persists, see run_async).
+    """
+    global _async_engine, _async_engine_loop
+    loop = asyncio.get_running_loop()
+    if _async_engine is None or _async_engine_loop is not loop:
+        if Config.DB_EXTERNAL_POOLER:
+            # Transaction-mode poolers can't keep server-side prepared statements
+            _async_engine = create_async_engine(
+                _async_url(Config.DB_URL),
+                poolclass=NullPool,
+                connect_args={"prepare_threshold": None}
+            )
+        else:
+            _async_engine = create_async_engine(
+                _async_url(Config.DB_URL),
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_recycle=Config.DB_POOL_RECYCLE,
+                pool_pre_ping=True
+            )
+        _async_engine_loop = loop
+    return _async_engine
+
+async def save_research_data_bulk(article_id: str, sources: list):
+    """
+    Saves scraped sources into source_contents with one multi-row INSERT.
+    Sources the article already has (same URL) are skipped, so a retried job
+    that saves them again doesn't duplicate rows.
+    """
+    if not sources:
+        return
+    
+    rows = []
+    params = {"article_id": article_id}
+    for i, src in enumerate(sources):
+        rows.append(
+            f"(gen_random_uuid(), CAST(:article_id AS uuid), :url_{i}, :title_{i}, :content_{i}, "
+            f":origin_{i}, CAST(:raw_chars_{i} AS integer), CAST(:extracted_chars_{i} AS integer))"
+        )
+        content = src.get('full_content', '')
+        params.update({
+            f"url_{i}": src['url'],
+            f"title_{i}": src['title'],
+            f"content_{i}": content,
+            f"origin_{i}": src.get('source_origin', 'Search'),
+            f"raw_chars_{i}": src.get('raw_content_chars'),
+            f"extracted_chars_{i}": len(content)
+        })
+    
+    async with get_async_engine().begin() as conn:
+        await conn.execute(text(f"""
+            INSERT INTO source_contents (
+                id, article_id, url, title, full_content, source_origin,
+                raw_content_chars, extracted_content_chars
+            )
+            SELECT v.* FROM (VALUES {", ".join(rows)}) AS v (
+                id, article_id, url, title, full_content, source_origin,
+                raw_content_chars, extracted_content_chars
+            )
+            WHERE NOT EXISTS (
+                SELECT 1 FROM source_contents s
+                WHERE s.article_id = v.article_id AND s.url = v.url
+            )
+        """), params)
+
+def schedule_research_save(article_id: str, sources: list):
+    """
+    Starts saving sources in the background so the pipeline doesn't wait on
+    the write; flush_research_saves must be awaited before the article is
+    finalized (and before the Lambda invocation returns).
+    """
+    task = asyncio.create_task(save_research_data_bulk(article_id, sources))
+    _pending_saves.setdefault(article_id, []).append((task, sources))
+
+async def flush_research_saves(article_id: str):
+    """Waits for the article's background source saves, retrying a failed one once."""
+    for task, sources in _pending_saves.pop(article_id, []):
+        try:
+            await task
+        except Exception as e:
+            print(f"⚠️ Background source save failed ({e}), retrying")
+            try:
+                await save_research_data_bulk(article_id, sources)
+            except Exception as e:
+                print(f"Error saving research: {e}")
+
+def _json_value(value, default):
+    if value is None:
+        return default
+    return json.loads(value) if isinstance(value, str) else value
+
+def load_article_research(article_id: str):
+    """Loads the stored SEO brief and sources of an article, for writer-only rewrites."""
+    engine = get_engine()
+    with engine.connect() as conn:
+        brief_row = conn.execute(text("""
+            SELECT keywords, outline, strategy, analysis_meta FROM seo_briefs
+            WHERE article_id = :id
+            LIMIT 1
+        """), {"id": article_id}).fetchone()
+        source_rows = conn.execute(text("""
+            SELECT url, title, full_content, source_origin, raw_content_chars
+            FROM source_contents
+            WHERE article_id = :id
+        """), {"id": article_id}).fetchall()
+    
+    if brief_row is None:
+        return None, []
+    
+    seo_brief = {
+        "keywords": _json_value(brief_row.keywords, []),
+        "detailed_outline": _json_value(brief_row.outline, []),
+        "strategy": brief_row.strategy or "",
+        "analysis_meta": _json_value(brief_row.analysis_meta, {})
+    }
+    sources = [{
+        "url": row.url,
+        "title": row.title,
+        "full_content": row.full_content or "",
+        "source_origin": row.source_origin,
+        "raw_content_chars": row.raw_content_chars
+    } for row in source_rows]
+    return seo_brief, sources
+
+def finalize_article_in_db(article_id: str, content: str, seo_brief: dict, save_brief: bool = True):
+    """
+    Replaces the brief (rewrites keep the stored brief), stores the content
+    and sets the final status in a single statement, so the article is never
+    left half-finalized and a repeated finalize doesn't duplicate the brief.
+    Errors propagate, so the job is reported as failed and retried.
+    """
+    with get_engine().begin() as conn:
+        # Status: a rewritten posted article stays 'posted', otherwise
+        # 'scheduled' if scheduled_at > now, else 'completed'
+        conn.execute(text("""
+            WITH old_brief AS (
+                DELETE FROM seo_briefs
+                WHERE article_id = CAST(:id AS uuid) AND CAST(:save_brief AS boolean)
+            ), new_brief AS (
+                INSERT INTO seo_briefs (id, article_id, keywords, outline, strategy, analysis_meta)
+                SELECT gen_random_uuid(), CAST(:id AS uuid), CAST(:keywords AS json), CAST(:outline AS json),
+                       :strategy, CAST(:analysis_meta AS json)
+                WHERE CAST(:save_brief AS boolean)
+            )
+            UPDATE articles 
+            SET content = :content,
+                status = CASE 
+                    WHEN NOT CAST(:save_brief AS boolean) AND posted_at IS NOT NULL THEN 'posted'
+                    WHEN scheduled_at > NOW() THEN 'scheduled' 
+                    ELSE 'completed' 
+                END,
+                error_message = NULL,
+                updated_at = NOW()
+            WHERE id = CAST(:id AS uuid)
+        """), {
+            "id": article_id,
+            "save_brief": save_brief,
+            "keywords": json.dumps(seo_brief.get('keywords', [])),
+            "outline": json.dumps(seo_brief.get('detailed_outline', {})),
+            "strategy": seo_brief.get('strategy', ''),
+            "analysis_meta": json.dumps(seo_brief.get('analysis_meta', {})),
+            "content": content
+        })
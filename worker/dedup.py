@@ -0,0 +1,116 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config import Config
+
+WORD_RE = re.compile(r"\w+")
+
+# MinHash parameters: 128 permutations split into 16 bands of 8 rows puts the
+# LSH candidate threshold around Jaccard 0.7; candidates are then verified.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Mersenne prime 2^31 - 1 keeps a * x + b inside uint64 for 31-bit inputs
+PRIME = np.uint64((1 << 31) - 1)
+
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+
+def _shingles(text: str) -> np.ndarray:
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return np.array([], dtype=np.uint64)
+    grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) & 0x7FFFFFFF for g in grams),
+        dtype=np.uint64,
+        count=len(grams)
+    )
+
+def _signature(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature: all permutations applied to all shingles in one vectorized step."""
+    hashed = (_A[:, None] * shingles[None, :] + _B[:, None]) % PRIME
+    return hashed.min(axis=1)
+
+def dedupe_sources(sources: List[Dict], threshold: float = None, drop_ratio: float = None) -> Tuple[List[Dict], Dict]:
+    """
+    Removes near-duplicate paragraphs across sources (e.g. syndicated wire copies).
+    Sources are processed in ranking order, so the first copy of a paragraph is
+    kept and later copies are dropped. Sources whose text is mostly duplicated
+    (>= drop_ratio) are flagged and left out entirely.
+    Returns the remaining sources (with deduplicated full_content) and stats.
+    """
+    threshold = threshold or Config.DEDUP_SIMILARITY_THRESHOLD
+    drop_ratio = drop_ratio or Config.DEDUP_SOURCE_DROP_RATIO
+
+    buckets = defaultdict(list)  # (band, band hash) -> [paragraph id]
+    signatures = []              # paragraph id -> (source index, signature)
+    meta = {"paragraphs_total": 0, "paragraphs_dropped": 0, "chars_dropped": 0, "duplicate_sources": []}
+
+    kept_sources = []
+    for s_idx, src in enumerate(sources):
+        kept_paragraphs = []
+        new_signatures = []
+        checked_chars = 0
+        dropped_chars = 0
+        matched_sources = Counter()
+
+        for paragraph in (src.get('full_content') or "").split("\n\n"):
+            if not paragraph.strip():
+                continue
+            meta["paragraphs_total"] += 1
+            shingles = _shingles(paragraph)
+            # Headings and very short paragraphs are kept without checking
+            if paragraph.startswith("#") or len(shingles) == 0:
+                kept_paragraphs.append(paragraph)
+                continue
+
+            checked_chars += len(paragraph)
+            signature = _signature(shingles)
+            band_keys = [(b, signature[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+            duplicate_of = None
+            for candidate in {pid for key in band_keys for pid in buckets[key]}:
+                c_source, c_signature = signatures[candidate]
+                if np.mean(c_signature == signature) >= threshold:
+                    duplicate_of = c_source
+                    break
+
+            if duplicate_of is not None:
+                dropped_chars += len(paragraph)
+                matched_sources[duplicate_of] += 1
+                continue
+
+            new_signatures.append((signature, band_keys))
+            kept_paragraphs.append(paragraph)
+
+        # Duplicates only ever match earlier, kept sources, so the first source always stays
+        ratio = dropped_chars / checked_chars if checked_chars else 0.0
+        if ratio >= drop_ratio:
+            meta["duplicate_sources"].append({
+                "url": src['url'],
+                "duplicate_ratio": round(ratio, 3),
+                "duplicate_of": sources[matched_sources.most_common(1)[0][0]]['url']
+            })
+            meta["paragraphs_dropped"] += len(kept_paragraphs) + sum(matched_sources.values())
+            meta["chars_dropped"] += len(src.get('full_content') or "")
+            continue
+
+        # Register this source's paragraphs only once we know it is kept
+        for signature, band_keys in new_signatures:
+            pid = len(signatures)
+            signatures.append((s_idx, signature))
+            for key in band_keys:
+                buckets[key].append(pid)
+
+        meta["paragraphs_dropped"] += sum(matched_sources.values())
+        meta["chars_dropped"] += dropped_chars
+        kept_sources.append({**src, "full_content": "\n\n".join(kept_paragraphs), "duplicate_ratio": round(ratio, 3)})
+
+    return kept_sources, meta
@@ -0,0 +1,164 @@
+import asyncio
+import base64
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from config import Config
+from db_sync import get_engine
+from http_fetcher import get_http_client
+
+logger = logging.getLogger(__name__)
+
+GNEWS_ARTICLE_RE = re.compile(r"news\.google\.com/(?:rss/)?(?:articles|read)/([A-Za-z0-9_\-]+)")
+SIGNATURE_RE = re.compile(r'data-n-a-sg="([^"]+)"')
+TIMESTAMP_RE = re.compile(r'data-n-a-ts="([^"]+)"')
+
+BATCH_EXECUTE_URL = "https://news.google.com/_/DotsSplashUi/data/batchexecute"
+
+# Google News article id -> publisher URL, for this container
+_memory: Dict[str, str] = {}
+
+def extract_article_id(url: str) -> Optional[str]:
+    match = GNEWS_ARTICLE_RE.search(url or "")
+    return match.group(1) if match else None
+
+def _decode_offline(article_id: str) -> Optional[str]:
+    """
+    Older article ids are a base64 protobuf that embeds the publisher URL directly.
+    Newer ids ('AU_yqL...') only carry an opaque token and return None here.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except Exception:
+        return None
+
+    prefix = b"\x08\x13\x22"
+    if not raw.startswith(prefix):
+        return None
+    raw = raw[len(prefix):]
+
+    # Varint length of the embedded string
+    length, shift, pos = 0, 0, 0
+    while pos < len(raw):
+        byte = raw[pos]
+        length |= (byte & 0x7F) << shift
+        pos += 1
+        if byte < 0x80:
+            break
+        shift += 7
+
+    try:
+        value = raw[pos:pos + length].decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    return value if value.startswith("http") else None
+
+async def _decode_online(article_id: str) -> Optional[str]:
+    """Resolves new-style ids with the same batchexecute call the Google News page makes."""
+    client = get_http_client()
+    try:
+        page = await client.get(f"https://news.google.com/rss/articles/{article_id}")
+        signature = SIGNATURE_RE.search(page.text)
+        timestamp = TIMESTAMP_RE.search(page.text)
+        if not signature or not timestamp:
+            return None
+
+        request = [
+            "Fbv4je",
+            f'["garturlreq",[["X","X",["X","X"],null,null,1,1,"US:en",null,1,null,null,null,null,null,0,1],'
+            f'"X","X",1,[1,1,1],1,1,null,0,0,null,0],"{article_id}",{timestamp.group(1)},"{signature.group(1)}"]'
+        ]
+        response = await client.post(
+            BATCH_EXECUTE_URL,
+            data={"f.req": json.dumps([[request]])},
+            headers={"Content-Type": "application/x-www-form-urlencoded;charset=UTF-8"}
+        )
+        response.raise_for_status()
+
+        parsed = json.loads(response.text.split("\n\n")[1])[:-2]
+        resolved = json.loads(parsed[0][2])[1]
+        return resolved if isinstance(resolved, str) and resolved.startswith("http") else None
+    except Exception as e:
+        logger.debug(f"Google News decode failed for {article_id}: {e}")
+        return None
+
+# --- Persistent mapping ---
+
+def _db_get(article_ids: List[str]) -> Dict[str, str]:
+    if not article_ids:
+        return {}
+    try:
+        with get_engine().connect() as conn:
+            rows = conn.execute(text("""
+                SELECT article_id, resolved_url FROM gnews_redirects
+                WHERE article_id = ANY(:ids)
+            """), {"ids": article_ids}).fetchall()
+        return {row.article_id: row.resolved_url for row in rows}
+    except Exception as e:
+        logger.warning(f"⚠️ Redirect mapping lookup failed: {e}")
+        return {}
+
+def _db_put(mapping: Dict[str, str]):
+    if not mapping:
+        return
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("""
+                INSERT INTO gnews_redirects (article_id, resolved_url, resolved_at)
+                VALUES (:article_id, :resolved_url, NOW())
+                ON CONFLICT (article_id) DO UPDATE
+                SET resolved_url = EXCLUDED.resolved_url, resolved_at = NOW()
+            """), [{"article_id": k, "resolved_url": v} for k, v in mapping.items()])
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Redirect mapping store failed: {e}")
+
+async def remember_redirects(redirects: Dict[str, str]):
+    """Stores {google_news_url: publisher_url} pairs learned elsewhere (e.g. by the browser)."""
+    mapping = {}
+    for url, resolved in redirects.items():
+        article_id = extract_article_id(url)
+        if article_id and resolved and "google.com" not in resolved:
+            mapping[article_id] = resolved
+    if mapping:
+        _memory.update(mapping)
+        await asyncio.to_thread(_db_put, mapping)
+
+async def resolve_google_news_urls(urls: List[str]) -> Dict[str, str]:
+    """
+    Resolves Google News article links to publisher URLs without a browser.
+    Lookup order: in-process memory, gnews_redirects table, offline base64
+    decoding, then Google's batchexecute endpoint. Returns {url: publisher_url}
+    for the links that could be resolved; the rest need a browser redirect.
+    """
+    ids = {url: extract_article_id(url) for url in urls}
+    ids = {url: article_id for url, article_id in ids.items() if article_id}
+    if not ids:
+        return {}
+
+    unknown = [a for a in set(ids.values()) if a not in _memory]
+    _memory.update(await asyncio.to_thread(_db_get, unknown))
+
+    learned = {}
+    semaphore = asyncio.Semaphore(Config.GNEWS_RESOLVE_CONCURRENCY)
+
+    async def resolve(article_id: str):
+        resolved = _decode_offline(article_id)
+        if not resolved:
+            async with semaphore:
+                resolved = await _decode_online(article_id)
+        if resolved:
+            learned[article_id] = resolved
+
+    await asyncio.gather(*(resolve(a) for a in set(ids.values()) if a not in _memory))
+    if learned:
+        _memory.update(learned)
+        await asyncio.to_thread(_db_put, learned)
+
+    resolved = {url: _memory[a] for url, a in ids.items() if a in _memory}
+    print(f"--- 🔗 Resolved {len(resolved)}/{len(ids)} Google News links without a browser ---")
+    return resolved
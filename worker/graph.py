@@ -2,15 +2,34 @@ import asyncio
 import json
 from typing import TypedDict, List, Dict, Optional
 
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
+from browser_manager import run_async
+from checkpointing import clear_checkpoint, get_checkpointer
+from config import Config
+from context_budget import count_tokens, fit_sources_to_budget, truncate_to_tokens
+from dedup import dedupe_sources
+from llm_cache import cache_key, cached_ainvoke, get_cache_stats, get_cached, is_enabled, llm_params, put_cached
+from passage_ranker import select_passages
 from scraper import scrape_urls
-from db_sync import save_research_data, finalize_article_in_db
-from search_tool import search_tool
+from scrape_cache import scrape_with_cache
+from db_sync import (
+    FINISHED_STATUSES, finalize_article_in_db, flush_research_saves, get_article_statuses,
+    load_article_research, mark_articles_failed, schedule_research_save
+)
+from search_tool import search_sources
+from stream_parser import OutlineStreamParser
 
 # High-capability model for Analysis and Writing
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+# One limiter for every call in the container, so concurrent jobs share the OpenAI rate limit
+llm_rate_limiter = InMemoryRateLimiter(
+    requests_per_second=Config.LLM_REQUESTS_PER_SECOND,
+    check_every_n_seconds=0.1,
+    max_bucket_size=Config.LLM_MAX_BURST
+)
+llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, rate_limiter=llm_rate_limiter)
 
 class AgentState(TypedDict):
     article_id: str
@@ -21,9 +40,18 @@ class AgentState(TypedDict):
     source_count: int
     urls: List[str]
     source_data: List[Dict]
+    reserve_sources: List[Dict]
+    search_stats: List[Dict]
+    dedupe_stats: Dict
     seo_brief: Dict
+    interactive: bool
+    section_drafts: List[str]
+    mode: str
+    tone: Optional[str]
+    variant_count: int
     final_content: str
     error: Optional[str]
+    failed_node: Optional[str]
 
 # --- Nodes ---
 
@@ -31,51 +59,84 @@ async def search_node(state: AgentState):
     """Search for sources using the approved title as query"""
     print(f"--- 🕵️ Searching for: {state['topic']} ---")
     
-    results = search_tool.invoke(state["topic"])
+    results, stats = await search_sources(state["topic"], min_results=state['source_count'])
     if not results:
-        return {"error": "No research sources found."}
+        return {"error": "No research sources found.", "search_stats": stats}
     
-    # Respect source_count constraint
+    # Respect source_count constraint; the rest can replace duplicate sources later
     top_results = results[:state['source_count']]
-    return {"urls": [r['url'] for r in top_results], "source_data": top_results}
+    return {
+        "urls": [r['url'] for r in top_results],
+        "source_data": top_results,
+        "reserve_sources": results[state['source_count']:],
+        "search_stats": stats
+    }
 
-async def scraper_node(state: AgentState):
-    """Deep scrape the found sources"""
-    print(f"--- 🕷️ Deep Scraping {len(state['urls'])} Sources ---")
-    scraped = await scrape_urls(state["urls"])
+async def _scrape_sources(sources: List[Dict]) -> List[Dict]:
+    """Scrapes search results and returns the ones with content, in input order"""
+    scraped = await scrape_with_cache([s['url'] for s in sources], scrape_urls)
     
     enhanced_sources = []
-    for original in state["source_data"]:
+    for original in sources:
         match = next((s for s in scraped if s['url'] == original['url']), None)
         if match and match.get('status') == 'success':
             original['full_content'] = match['content']
+            original['raw_content_chars'] = match.get('raw_length')
             enhanced_sources.append(original)
+    return enhanced_sources
+
+async def scraper_node(state: AgentState):
+    """Deep scrape the found sources"""
+    print(f"--- 🕷️ Deep Scraping {len(state['urls'])} Sources ---")
+    enhanced_sources = await _scrape_sources(state["source_data"])
             
     if not enhanced_sources:
         return {"error": "Failed to extract content from all sources."}
-        
-    save_research_data(state['article_id'], enhanced_sources)
+    
+    # Written in the background while the analyzer runs; flushed before finalize
+    schedule_research_save(state['article_id'], enhanced_sources)
     return {"source_data": enhanced_sources}
 
-async def analyzer_node(state: AgentState):
-    """Analyze sources and create comprehensive SEO brief with extensive outline"""
-    print(f"--- 🧠 Analyzing {len(state['source_data'])} Sources for Deep Insights ---")
+async def dedupe_node(state: AgentState):
+    """Drop near-duplicate paragraphs across sources and replace mostly-duplicate sources"""
+    if not Config.DEDUP_ENABLED:
+        return {}
     
-    # Build structured context from ALL sources
-    dossier_context = ""
-    for i, src in enumerate(state['source_data']):
-        dossier_context += f"""
-        <source id="{i+1}">
-            <url>{src['url']}</url>
-            <title>{src['title']}</title>
-            <content>
-            {src.get('full_content', 'No content available')[:15000]}
-            </content>
-        </source>
-        """
+    print(f"--- 🧬 Deduplicating {len(state['source_data'])} Sources ---")
+    sources, stats = dedupe_sources(state['source_data'])
+    
+    # Swap syndicated copies for distinct reserve results when search gave us extras
+    reserves = state.get('reserve_sources') or []
+    missing = len(state['source_data']) - len(sources)
+    if missing and reserves:
+        replacements = await _scrape_sources(reserves[:missing])
+        if replacements:
+            schedule_research_save(state['article_id'], replacements)
+            sources, second_pass = dedupe_sources(sources + replacements)
+            stats["paragraphs_dropped"] += second_pass["paragraphs_dropped"]
+            stats["chars_dropped"] += second_pass["chars_dropped"]
+            stats["duplicate_sources"] += second_pass["duplicate_sources"]
+            kept_urls = {s['url'] for s in sources}
+            stats["replacements"] = [r['url'] for r in replacements if r['url'] in kept_urls]
+        reserves = reserves[missing:]
+    
+    print(f"✅ Dropped {stats['paragraphs_dropped']}/{stats['paragraphs_total']} duplicate paragraphs "
+          f"({stats['chars_dropped']} chars), {len(stats['duplicate_sources'])} duplicate sources")
+    
+    return {"source_data": sources, "reserve_sources": reserves, "dedupe_stats": stats}
 
-    prompt = f"""
-You are an elite SEO Research Strategist and Content Architect. You have been given {len(state['source_data'])} complete source articles to analyze.
+def _parse_json_response(content: str):
+    """Parses an LLM JSON reply, tolerating markdown code fences"""
+    content = content.strip()
+    # Clean up markdown code blocks if present
+    if content.startswith("```"):
+        content = content.replace("```json", "").replace("```", "").strip()
+    return json.loads(content)
+
+def _brief_prompt(state: AgentState, material_intro: str, material_label: str, material: str) -> str:
+    """Builds the brief/outline prompt around either full sources or condensed notes"""
+    return f"""
+You are an elite SEO Research Strategist and Content Architect. {material_intro}
 
 ARTICLE TITLE: {state['topic']}
 CATEGORY: {state['category']}
@@ -181,56 +242,235 @@ CRITICAL:
 - Include concrete details in points (not "discuss benefits" but "how X increases Y by Z%")
 - Create an outline so detailed that a writer can create a comprehensive article just by following it
 
-RESEARCH SOURCES:
-{dossier_context}
+{material_label}:
+{material}
 
 Now analyze these sources deeply and return the comprehensive JSON brief:
 """
+
+def _use_map_reduce(state: AgentState) -> bool:
+    """Map-reduce pays off for long articles built from many sources"""
+    if Config.ANALYZER_MODE == "map_reduce":
+        return True
+    if Config.ANALYZER_MODE == "auto":
+        return (
+            len(state['source_data']) >= Config.ANALYZER_MAP_REDUCE_MIN_SOURCES
+            and state['target_length'] >= Config.ANALYZER_MAP_REDUCE_MIN_LENGTH
+        )
+    return False
+
+async def _extract_source_notes(state: AgentState, contents: List[str], analysis_meta: Dict) -> str:
+    """Map step: condense every source into facts, stats and quotes in parallel"""
+    semaphore = asyncio.Semaphore(Config.ANALYZER_MAP_CONCURRENCY)
+    
+    async def extract(i: int, src: Dict, content: str):
+        prompt = f"""
+You are a meticulous research analyst. Extract everything from this ONE source that could be useful for an article.
+
+ARTICLE TITLE: {state['topic']}
+CATEGORY: {state['category']}
+
+RETURN ONLY THIS JSON STRUCTURE (no markdown, no extra text):
+{{
+    "summary": "2-3 sentence summary of the source's main argument",
+    "facts": ["specific fact or insight", ...],
+    "statistics": ["exact number with its context", ...],
+    "quotes": [{{"quote": "verbatim quote", "speaker": "who said it"}}, ...],
+    "examples": ["case study or real-world example", ...],
+    "keywords": ["keyword or phrase used by the source", ...]
+}}
+
+RULES:
+- Only include information that is actually in the source - never invent
+- Keep numbers, names and dates exact
+- Skip anything unrelated to the article title
+
+SOURCE:
+<url>{src['url']}</url>
+<title>{src['title']}</title>
+<content>
+{content}
+</content>
+"""
+        async with semaphore:
+            try:
+                content = await cached_ainvoke(llm, prompt, "analyze_map", validate=_parse_json_response)
+                return _parse_json_response(content)
+            except Exception as e:
+                print(f"⚠️ Map extraction failed for source {i+1}: {e}")
+                return None
+    
+    notes = await asyncio.gather(*(
+        extract(i, src, content) for i, (src, content) in enumerate(zip(state['source_data'], contents))
+    ))
+    
+    note_parts = []
+    for i, (src, note, content) in enumerate(zip(state['source_data'], notes, contents)):
+        # A failed extraction falls back to a short excerpt so the source still counts
+        body = json.dumps(note, indent=1, ensure_ascii=False) if note else truncate_to_tokens(
+            content, Config.ANALYZER_SOURCE_TOKEN_FLOOR, llm.model_name
+        )
+        note_parts.append(f"""
+        <source id="{i+1}">
+            <url>{src['url']}</url>
+            <title>{src['title']}</title>
+            <notes>
+            {body}
+            </notes>
+        </source>
+        """)
+    
+    analysis_meta["mode"] = "map_reduce"
+    analysis_meta["map_calls"] = len(notes)
+    analysis_meta["map_failures"] = sum(note is None for note in notes)
+    return "".join(note_parts)
+
+async def _stream_reply(prompt: str, cached: Optional[str] = None):
+    if cached is not None:
+        yield cached
+        return
+    async for chunk in llm.astream(prompt):
+        yield chunk.content
+
+async def _analyze_streaming(state: AgentState, prompt: str):
+    """
+    Streams the analyzer reply and starts a section writer as soon as each
+    outline section is complete, so writing overlaps with the rest of the
+    analysis. Returns the parsed brief and the section drafts (empty when the
+    drafts can't be used and the writer node should write from scratch).
+    """
+    parser = OutlineStreamParser()
+    semaphore = asyncio.Semaphore(Config.WRITER_SECTION_CONCURRENCY)
+    # Section count isn't known yet; the brief prompt asks for 5-8 main sections
+    words = max(150, state['target_length'] // Config.STREAMING_EXPECTED_SECTIONS)
+    tasks = []
+    chunks = []
+    
+    # A cached reply is replayed through the same parser in one piece
+    key = cache_key(llm.model_name, llm_params(llm), prompt) if is_enabled("analyze") else None
+    cached = await get_cached(key, "analyze") if key else None
     
     try:
-        response = await llm.ainvoke(prompt)
-        content = response.content.strip()
-        
-        # Clean up markdown code blocks if present
-        if content.startswith("```"):
-            content = content.replace("```json", "").replace("```", "").strip()
-        
-        brief = json.loads(content)
+        async for chunk in _stream_reply(prompt, cached):
+            chunks.append(chunk)
+            for section in parser.feed(chunk):
+                print(f"--- ⚡ Outline section {len(tasks) + 1} ready, writing: {section.get('heading', '')} ---")
+                # The full brief isn't parsed yet, its keywords already streamed in
+                section_state = {**state, "seo_brief": {"keywords": parser.keywords}}
+                tasks.append(asyncio.create_task(
+                    _write_section(section_state, list(parser.sections), len(tasks), words, semaphore, final=False)
+                ))
+        brief = _parse_json_response("".join(chunks))
+        if key and cached is None:
+            await put_cached(key, llm.model_name, "analyze", "".join(chunks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    if len(tasks) != len(brief.get('detailed_outline', [])):
+        print(f"⚠️ Streamed {len(tasks)} sections but the outline has {len(brief.get('detailed_outline', []))}, writing after analysis")
+        for task in tasks:
+            task.cancel()
+        return brief, []
+    
+    # Budgets assumed STREAMING_EXPECTED_SECTIONS; too far off the target length, write after analysis
+    drift = abs(len(tasks) * words - state['target_length']) / state['target_length']
+    if drift > Config.STREAMING_MAX_LENGTH_DRIFT:
+        print(f"⚠️ {len(tasks)} sections x {words} words misses the {state['target_length']}-word target, writing after analysis")
+        for task in tasks:
+            task.cancel()
+        return brief, []
+    
+    drafts = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = [d for d in drafts if isinstance(d, BaseException)]
+    if failed:
+        print(f"⚠️ {len(failed)} streamed section(s) failed, writing after analysis: {failed[0]}")
+        return brief, []
+    return brief, list(drafts)
+
+async def analyzer_node(state: AgentState):
+    """Analyze sources and create comprehensive SEO brief with extensive outline"""
+    print(f"--- 🧠 Analyzing {len(state['source_data'])} Sources for Deep Insights ---")
+    
+    # Fit every source into the analyzer's token budget, keeping the passages
+    # most relevant to the title when passage selection is enabled
+    contents = [src.get('full_content', 'No content available') for src in state['source_data']]
+    map_reduce = _use_map_reduce(state)
+    # Map calls see one source each, so the shared budget only has to cover the per-source caps
+    budget = Config.ANALYZER_SOURCE_TOKEN_CAP * len(contents) if map_reduce else None
+    if Config.ANALYZER_PASSAGE_SELECTION:
+        contents, analysis_meta = select_passages(
+            contents, f"{state['topic']} {state['category']}", model=llm.model_name, total=budget
+        )
+        print(f"--- 🎯 Kept {sum(analysis_meta['passages_kept'])}/{sum(analysis_meta['passages_total'])} relevant passages ---")
+    else:
+        contents, analysis_meta = fit_sources_to_budget(contents, model=llm.model_name, total=budget)
+
+    if map_reduce:
+        # Map: per-source extraction in parallel; Reduce: outline from the condensed notes
+        print(f"--- 🗺️ Map-reduce analysis over {len(contents)} sources ---")
+        notes = await _extract_source_notes(state, contents, analysis_meta)
+        prompt = _brief_prompt(
+            state,
+            f"You have been given research notes extracted from {len(state['source_data'])} source articles to analyze.",
+            "CONDENSED RESEARCH NOTES",
+            notes
+        )
+    else:
+        # Build structured context from ALL sources
+        dossier_parts = []
+        for i, (src, content) in enumerate(zip(state['source_data'], contents)):
+            dossier_parts.append(f"""
+        <source id="{i+1}">
+            <url>{src['url']}</url>
+            <title>{src['title']}</title>
+            <content>
+            {content}
+            </content>
+        </source>
+        """)
+        analysis_meta["mode"] = "single"
+        prompt = _brief_prompt(
+            state,
+            f"You have been given {len(state['source_data'])} complete source articles to analyze.",
+            "RESEARCH SOURCES",
+            "".join(dossier_parts)
+        )
+    
+    analysis_meta["prompt_tokens"] = count_tokens(prompt, llm.model_name)
+    if state.get("search_stats"):
+        analysis_meta["search"] = state["search_stats"]
+    if state.get("dedupe_stats"):
+        analysis_meta["dedupe"] = state["dedupe_stats"]
+    print(f"--- 📏 Analyzer prompt: {analysis_meta['prompt_tokens']} tokens "
+          f"({analysis_meta['source_tokens_used']}/{analysis_meta['input_token_budget']} source budget) ---")
+    
+    try:
+        section_drafts = []
+        if state.get("interactive") and Config.STREAMING_PIPELINE:
+            brief, section_drafts = await _analyze_streaming(state, prompt)
+            analysis_meta["streamed_sections"] = len(section_drafts)
+        else:
+            content = await cached_ainvoke(llm, prompt, "analyze", validate=_parse_json_response)
+            brief = _parse_json_response(content)
+        brief["analysis_meta"] = analysis_meta
         
         print(f"✅ Generated outline with {len(brief.get('detailed_outline', []))} main sections")
         print(f"✅ Extracted {len(brief.get('keywords', []))} SEO keywords")
         
-        return {"seo_brief": brief}
+        return {"seo_brief": brief, "section_drafts": section_drafts}
     except Exception as e:
         print(f"⚠️ Error parsing analyzer response: {e}")
         # Fallback brief
         return {"seo_brief": {
             "keywords": [],
             "detailed_outline": [],
-            "strategy": "Comprehensive coverage"
-        }}
+            "strategy": "Comprehensive coverage",
+            "analysis_meta": analysis_meta
+        }, "section_drafts": []}
 
-async def writer_node(state: AgentState):
-    """Write expert-level, human content following the detailed outline"""
-    print(f"--- ✍️ Writing Expert-Level {state['target_length']}-Word Article ---")
-    
-    # Convert outline to readable format
-    outline_str = json.dumps(state['seo_brief']['detailed_outline'], indent=2)
-    keywords_str = ', '.join(state['seo_brief'].get('keywords', [])[:15])
-    
-    prompt = f"""
-You are a professional content writer with 10+ years of experience in {state['category']}. Write a comprehensive, engaging article that reads like it was written by a human expert - NOT an AI.
-
-ARTICLE DETAILS:
-Title: {state['topic']}
-Category: {state['category']}
-Target Length: {state['target_length']} words (±5%)
-SEO Keywords: {keywords_str}
-
-DETAILED OUTLINE TO FOLLOW:
-{outline_str}
-
-CRITICAL WRITING RULES - READ CAREFULLY:
+WRITING_RULES = """CRITICAL WRITING RULES - READ CAREFULLY:
 
 1. WRITE LIKE A HUMAN EXPERT:
    - Use natural, conversational language (as if explaining to a colleague)
@@ -295,15 +535,207 @@ EXAMPLE OF GOOD VS BAD WRITING:
 BAD (AI-like): "In today's rapidly evolving digital landscape, it is increasingly important for businesses to leverage cutting-edge technologies in order to stay competitive and unlock new opportunities for growth."
 
 GOOD (Human expert): "Companies that ignore new technology fall behind. Simple as that. The question isn't whether to adopt AI tools - it's which ones work for your specific goals."
+"""
+
+def _writer_notes(state: AgentState) -> str:
+    """Extra article details for rewrites (requested tone) and grouped variants"""
+    notes = ""
+    if state.get('tone'):
+        notes += f"\nRequested Tone: {state['tone']} (use this instead of the default TONE rules)"
+    if state.get('variant_count', 1) > 1:
+        notes += (
+            f"\nVariant: one of {state['variant_count']} articles written from the same research and outline - "
+            "take the angle this title promises so it reads as a distinct article"
+        )
+    return notes
 
+async def _write_single(state: AgentState) -> str:
+    """Writes the whole article in one call"""
+    # Convert outline to readable format
+    outline_str = json.dumps(state['seo_brief']['detailed_outline'], indent=2)
+    keywords_str = ', '.join(state['seo_brief'].get('keywords', [])[:15])
+    
+    prompt = f"""
+You are a professional content writer with 10+ years of experience in {state['category']}. Write a comprehensive, engaging article that reads like it was written by a human expert - NOT an AI.
+
+ARTICLE DETAILS:
+Title: {state['topic']}
+Category: {state['category']}
+Target Length: {state['target_length']} words (±5%)
+SEO Keywords: {keywords_str}{_writer_notes(state)}
+
+DETAILED OUTLINE TO FOLLOW:
+{outline_str}
+
+{WRITING_RULES}
 Now write the complete article following these rules. Make it sound like a knowledgeable human expert wrote it, not an AI. Hit exactly {state['target_length']} words.
 
 Write in Markdown format starting with the title:
 """
     
+    content = await cached_ainvoke(llm, prompt, "write")
+    return content.strip()
+
+def _section_weight(section: Dict) -> int:
+    """Rough size of an outline section: its points plus its subsections' points"""
+    return len(section.get('points', [])) + sum(
+        1 + len(sub.get('points', [])) for sub in section.get('subsections', [])
+    )
+
+def _use_section_writer(state: AgentState) -> bool:
+    if len(state['seo_brief'].get('detailed_outline', [])) < 2:
+        return False
+    if Config.WRITER_MODE == "sections":
+        return True
+    if Config.WRITER_MODE == "auto":
+        return state['target_length'] >= Config.WRITER_SECTIONS_MIN_LENGTH
+    return False
+
+async def _write_section(
+    state: AgentState,
+    sections: List[Dict],
+    index: int,
+    words: int,
+    semaphore: asyncio.Semaphore,
+    final: bool = True
+) -> str:
+    """
+    Writes one level-1 outline section; every section call shares the same
+    style header. final=False means the outline is still being streamed and
+    `sections` only holds the sections planned so far.
+    """
+    section = sections[index]
+    keywords_str = ', '.join(state['seo_brief'].get('keywords', [])[:15])
+    structure = "\n".join(
+        f"{i+1}. {s.get('heading', '')}{'  <-- YOU ARE WRITING THIS SECTION' if i == index else ''}"
+        for i, s in enumerate(sections)
+    )
+    if not final:
+        structure += "\n... (later sections are still being planned)"
+    if index == 0:
+        placement = "This is the OPENING of the article. Do NOT write a heading - start directly with the hook paragraph. The article title is already in place."
+    elif final and index == len(sections) - 1:
+        placement = f"This is the FINAL section. Start with the heading: ## {section.get('heading', '')}"
+    else:
+        placement = f"Start with the heading: ## {section.get('heading', '')}"
+    
+    prompt = f"""
+You are a professional content writer with 10+ years of experience in {state['category']}. You are writing ONE section of a longer article; other writers are writing the other sections in parallel, so match the shared style exactly and stay inside your section's scope.
+
+ARTICLE DETAILS:
+Title: {state['topic']}
+Category: {state['category']}
+Full Article Length: {state['target_length']} words
+SEO Keywords: {keywords_str}{_writer_notes(state)}
+
+FULL ARTICLE STRUCTURE:
+{structure}
+
+YOUR SECTION OUTLINE:
+{json.dumps(section, indent=2)}
+
+SECTION LENGTH: about {words} words (±10%)
+
+PLACEMENT:
+{placement}
+- Cover every point in YOUR section outline and nothing that belongs to other sections
+- Use ### for subsections
+- Do not summarize the whole article or refer to "the next section"
+
+{WRITING_RULES}
+Now write ONLY this section in Markdown:
+"""
+    async with semaphore:
+        content = (await cached_ainvoke(llm, prompt, "write_section")).strip()
+    if content.startswith("# "):
+        # Drop a repeated article title
+        content = content.split("\n", 1)[1].strip() if "\n" in content else ""
+    return content
+
+def _boundary(text: str, first: bool) -> str:
+    """First or last prose paragraph of a section (headings skipped)"""
+    paragraphs = [p for p in text.split("\n\n") if p.strip() and not p.lstrip().startswith("#")]
+    if not paragraphs:
+        return ""
+    return paragraphs[0] if first else paragraphs[-1]
+
+def _insert_bridge(draft: str, bridge: str) -> str:
+    """Places the bridge as its own paragraph right after the section's heading line"""
+    lines = draft.lstrip("\n").split("\n", 1)
+    if lines[0].lstrip().startswith("#"):
+        rest = lines[1].strip("\n") if len(lines) > 1 else ""
+        return f"{lines[0]}\n\n{bridge}" + (f"\n\n{rest}" if rest else "")
+    return f"{bridge}\n\n{draft}"
+
+async def _stitch_sections(state: AgentState, drafts: List[str]) -> str:
+    """
+    Lightweight stitching pass: instead of rewriting the article, the model
+    only sees the paragraphs on either side of each section boundary and
+    returns one bridging sentence per boundary, which is placed at the start
+    of the following section.
+    """
+    joins = "\n".join(
+        f"""<boundary id="{i}">
+<end_of_previous>{_boundary(drafts[i - 1], first=False)}</end_of_previous>
+<start_of_next>{_boundary(drafts[i], first=True)}</start_of_next>
+</boundary>"""
+        for i in range(1, len(drafts))
+    )
+    prompt = f"""
+These are the boundaries between sections of the article "{state['topic']}", written separately.
+For each boundary, write ONE short, natural transition sentence that opens the next section and connects it to the previous one.
+Avoid AI clichés ("delve into", "landscape", "game-changer", "in today's digital age") and don't repeat the heading.
+
+RETURN ONLY JSON (no markdown): {{"1": "transition sentence", "2": "..."}}
+
+{joins}
+"""
+    bridges = {}
     try:
-        response = await llm.ainvoke(prompt)
-        content = response.content.strip()
+        bridges = _parse_json_response(
+            await cached_ainvoke(llm, prompt, "stitch", validate=_parse_json_response)
+        )
+    except Exception as e:
+        print(f"⚠️ Transition pass failed, joining sections as written: {e}")
+    
+    parts = [f"# {state['topic']}", drafts[0]]
+    for i, draft in enumerate(drafts[1:], start=1):
+        bridge = str(bridges.get(str(i), "")).strip()
+        if bridge:
+            draft = _insert_bridge(draft, bridge)
+        parts.append(draft)
+    return "\n\n".join(part for part in parts if part)
+
+async def _write_sections(state: AgentState) -> str:
+    """Writes every level-1 outline section concurrently, then stitches them"""
+    sections = state['seo_brief']['detailed_outline']
+    weights = [max(_section_weight(section), 1) for section in sections]
+    words = [max(150, state['target_length'] * w // sum(weights)) for w in weights]
+    
+    semaphore = asyncio.Semaphore(Config.WRITER_SECTION_CONCURRENCY)
+    print(f"--- ⚡ Writing {len(sections)} sections in parallel ---")
+    drafts = await asyncio.gather(*(
+        _write_section(state, sections, i, words[i], semaphore) for i in range(len(sections))
+    ))
+    return await _stitch_sections(state, drafts)
+
+async def writer_node(state: AgentState):
+    """Write expert-level, human content following the detailed outline"""
+    print(f"--- ✍️ Writing Expert-Level {state['target_length']}-Word Article ---")
+    
+    try:
+        content = None
+        if state.get("section_drafts"):
+            # Sections were already written while the outline was streaming
+            print(f"--- 🧵 Stitching {len(state['section_drafts'])} pre-written sections ---")
+            content = await _stitch_sections(state, state['section_drafts'])
+        elif _use_section_writer(state):
+            try:
+                content = await _write_sections(state)
+            except Exception as e:
+                print(f"⚠️ Section writer failed, writing in one pass: {e}")
+        if content is None:
+            content = await _write_single(state)
         
         # Ensure it starts with a heading
         if not content.startswith("#"):
@@ -318,28 +750,110 @@ Write in Markdown format starting with the title:
         return {"final_content": f"# {state['topic']}\n\nError generating content.", "error": str(e)}
 
 # --- Graph Assembly ---
-workflow = StateGraph(AgentState)
+NODES = [
+    ("search", search_node),
+    ("scrape", scraper_node),
+    ("dedupe", dedupe_node),
+    ("analyze", analyzer_node),
+    ("write", writer_node),
+]
+NODE_ORDER = [name for name, _ in NODES]
+
+def _record_failure(name: str, node):
+    """Tags an error update with the node that produced it, so a retry knows where to resume"""
+    async def run(state: AgentState):
+        update = await node(state)
+        if update.get("error"):
+            update["failed_node"] = name
+        return update
+    return run
 
-workflow.add_node("search", search_node)
-workflow.add_node("scrape", scraper_node)
-workflow.add_node("analyze", analyzer_node)
-workflow.add_node("write", writer_node)
+# Modes that start at the writer with a brief that already exists
+WRITER_ONLY_MODES = ("rewrite", "variant")
+
+def _continue_to(next_node: str):
+    def route(state: AgentState):
+        if state.get("error"):
+            return END
+        # Grouped jobs run the research stages once, then write every variant separately
+        if next_node == "write" and state.get("mode") == "research":
+            return END
+        return next_node
+    return route
+
+workflow = StateGraph(AgentState)
+for name, node in NODES:
+    workflow.add_node(name, _record_failure(name, node))
 
-workflow.set_entry_point("search")
-workflow.add_edge("search", "scrape")
-workflow.add_edge("scrape", "analyze")
-workflow.add_edge("analyze", "write")
+# Rewrites and grouped variants reuse an existing brief and go straight to the writer
+workflow.set_conditional_entry_point(
+    lambda state: "write" if state.get("mode") in WRITER_ONLY_MODES else "search",
+    ["search", "write"]
+)
+for name, next_node in zip(NODE_ORDER, NODE_ORDER[1:]):
+    workflow.add_conditional_edges(name, _continue_to(next_node), [next_node, END])
 workflow.add_edge("write", END)
 
-app = workflow.compile()
+_app = None
 
-def handler(event, context):
-    """Lambda handler function"""
-    body = event if "article_id" in event else json.loads(event.get("body", "{}"))
+async def get_app():
+    """Compiles the graph once per container, with the checkpointer if one is configured"""
+    global _app
+    if _app is None:
+        _app = workflow.compile(checkpointer=await get_checkpointer())
+    return _app
+
+def _thread_id(state: AgentState) -> str:
+    # Writer-only and research-only runs get their own thread so they never
+    # pick up (or leave behind) a checkpoint a full generation would reuse
+    if state.get("mode") in WRITER_ONLY_MODES + ("research",):
+        return f"{state['article_id']}:{state['mode']}"
+    return state['article_id']
+
+async def run_workflow(initial_state: AgentState) -> Dict:
+    """
+    Runs the graph with the article id as checkpoint thread. A retried or
+    redelivered job resumes from the first node that hasn't finished:
+    - interrupted run (crash/timeout): continue from the pending node
+    - run that ended with an error: rewind to just before the failed node
+    - run that already completed: reuse its result
+    """
+    app = await get_app()
+    if app.checkpointer is None:
+        return await app.ainvoke(initial_state)
+    
+    config = {"configurable": {"thread_id": _thread_id(initial_state)}}
+    snapshot = await app.aget_state(config)
+    if not snapshot.values or initial_state.get("mode") in WRITER_ONLY_MODES:
+        return await app.ainvoke(initial_state, config)
     
+    if snapshot.next:
+        print(f"--- ♻️ Resuming from checkpoint at: {', '.join(snapshot.next)} ---")
+        return await app.ainvoke(None, config)
+    
+    failed_node = snapshot.values.get("failed_node")
+    if snapshot.values.get("error") and failed_node in NODE_ORDER:
+        index = NODE_ORDER.index(failed_node)
+        if index == 0:
+            return await app.ainvoke(initial_state, config)
+        print(f"--- ♻️ Retrying from failed node: {failed_node} ---")
+        await app.aupdate_state(
+            config, {"error": None, "failed_node": None}, as_node=NODE_ORDER[index - 1]
+        )
+        return await app.ainvoke(None, config)
+    
+    # Only a finished run that produced what this mode needs is reusable
+    produced = "seo_brief" if initial_state.get("mode") == "research" else "final_content"
+    if not snapshot.values.get(produced):
+        return await app.ainvoke(initial_state, config)
+    
+    print("--- ♻️ Article already generated, reusing checkpointed result ---")
+    return snapshot.values
+
+def _initial_state(body: Dict) -> AgentState:
     approved_title = body["query"]
     
-    initial_state = {
+    return {
         "article_id": body["article_id"],
         "raw_query": approved_title,
         "topic": approved_title,
@@ -348,59 +862,220 @@ def handler(event, context):
         "source_count": body.get("source_count", 5),
         "urls": [], 
         "source_data": [], 
+        "reserve_sources": [],
+        "search_stats": [],
+        "dedupe_stats": {},
         "seo_brief": {}, 
+        "interactive": body.get("interactive", False),
+        "section_drafts": [],
         "final_content": "", 
-        "error": None
+        "error": None,
+        "failed_node": None,
+        "mode": body.get("mode", "generate"),
+        "tone": body.get("tone"),
+        "variant_count": body.get("variant_count", 1)
     }
+
+def _check_result(result: Dict):
+    if result.get("error"):
+        raise Exception(result["error"])
     
-    print(f"🚀 STARTING ARTICLE GENERATION")
+    if not result.get("final_content"):
+        raise Exception("No content was generated")
+
+async def _load_rewrite_research(state: AgentState):
+    seo_brief, sources = await asyncio.to_thread(load_article_research, state["article_id"])
+    if not seo_brief or not seo_brief.get("detailed_outline"):
+        raise Exception("No stored brief to rewrite from")
+    state["seo_brief"] = seo_brief
+    state["source_data"] = sources
+    state["urls"] = [src['url'] for src in sources]
+    print(f"--- 📚 Loaded stored brief and {len(sources)} sources ---")
+
+async def generate_article_workflow(
+    article_id: str,
+    query: str,
+    category: str = "General",
+    target_length: int = 1500,
+    source_count: int = 5,
+    **options
+) -> Dict:
+    """
+    Runs one article job (generate or rewrite) for the SQS handler without
+    touching the article row (its scraped sources are saved by the time this
+    returns). Returns {"status": "success", "content", "seo_brief", "sources"}
+    or {"status": "error", "error"}.
+    """
+    state = _initial_state({
+        "article_id": article_id,
+        "query": query,
+        "category": category,
+        "target_length": target_length,
+        "source_count": source_count,
+        **options
+    })
+    try:
+        if state["mode"] == "rewrite":
+            await _load_rewrite_research(state)
+        result = await run_workflow(state)
+        _check_result(result)
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    finally:
+        # Sources are written in the background during the run
+        await flush_research_saves(article_id)
     
+    return {
+        "status": "success",
+        "content": result["final_content"],
+        "seo_brief": result["seo_brief"],
+        "sources": result["source_data"],
+        "thread_id": _thread_id(state)
+    }
+
+async def run_group(body: Dict, statuses: Dict[str, str] = None) -> Dict[str, Dict]:
+    """
+    Grouped job: one research pass (search, scrape, dedupe, analyze) for the
+    lead title, then one concurrent writer run per article in the group, each
+    with its own title and target length. Returns {article_id: result or error}.
+    Articles that are already finished (a redelivered message) are skipped;
+    pass `statuses` when the caller already looked them up.
+    """
+    articles = body["articles"]
+    if statuses is None:
+        statuses = await asyncio.to_thread(get_article_statuses, [item["article_id"] for item in articles])
+    finished = {a for a, status in statuses.items() if status in FINISHED_STATUSES}
+    pending = [item for item in articles if item["article_id"] not in finished]
+    skipped = {a: {"status": "already_finished"} for a in finished}
+    if not pending:
+        return skipped
+    
+    research_state = _initial_state({**body, **articles[0], "mode": "research"})
     try:
-        result = asyncio.run(app.ainvoke(initial_state))
+        research = await run_workflow(research_state)
+    except Exception:
+        await flush_research_saves(research_state["article_id"])
+        raise
+    if research.get("error"):
+        await flush_research_saves(research_state["article_id"])
+        raise Exception(research["error"])
+    print(f"--- 🧬 Shared research ready, writing {len(pending)} variants ---")
+    
+    async def write_variant(item: Dict):
+        state = _initial_state({
+            **body,
+            **item,
+            "mode": "variant",
+            "variant_count": len(articles),
+            "interactive": False
+        })
+        state["seo_brief"] = research["seo_brief"]
+        state["source_data"] = research["source_data"]
+        state["urls"] = research["urls"]
+        if item["article_id"] != research_state["article_id"]:
+            # The lead article's sources were saved by the scrape node
+            schedule_research_save(item["article_id"], research["source_data"])
         
-        if result.get("error"):
-            raise Exception(result["error"])
+        try:
+            result = await run_workflow(state)
+        finally:
+            await flush_research_saves(item["article_id"])
+        _check_result(result)
+        await asyncio.to_thread(finalize_article_in_db, item["article_id"], result["final_content"], result["seo_brief"])
+        if Config.CHECKPOINT_DELETE_ON_SUCCESS:
+            await clear_checkpoint(_thread_id(state))
+        return result
+    
+    outcomes = await asyncio.gather(*(write_variant(item) for item in pending), return_exceptions=True)
+    # Only pending when the lead article itself had already finished
+    await flush_research_saves(research_state["article_id"])
+    if Config.CHECKPOINT_DELETE_ON_SUCCESS and not any(isinstance(o, BaseException) for o in outcomes):
+        await clear_checkpoint(_thread_id(research_state))
+    return {**skipped, **{item["article_id"]: outcome for item, outcome in zip(pending, outcomes)}}
+
+def _handle_group(body: Dict):
+    article_ids = [item["article_id"] for item in body["articles"]]
+    print(f"🚀 STARTING GROUPED GENERATION ({len(article_ids)} articles)")
+    
+    statuses = get_article_statuses(article_ids)
+    try:
+        outcomes = run_async(run_group(body, statuses=statuses))
+    except Exception as e:
+        # Research failed, so every article still pending failed; finished
+        # ones (a redelivered group) keep their status
+        pending = [a for a in article_ids if statuses.get(a) not in FINISHED_STATUSES]
+        mark_articles_failed({article_id: str(e) for article_id in pending})
+        return {"statusCode": 500, "body": json.dumps({"error": str(e), "article_ids": pending})}
+    
+    failed = {}
+    for article_id, outcome in outcomes.items():
+        if isinstance(outcome, BaseException):
+            print(f"❌ Variant failed: {article_id} - {outcome}")
+            failed[article_id] = str(outcome)
+    mark_articles_failed(failed)
+    
+    print(f"✅ GROUPED GENERATION COMPLETE: {len(outcomes) - len(failed)}/{len(outcomes)} articles")
+    return {
+        "statusCode": 500 if failed else 200,
+        "body": json.dumps({
+            "message": "Partial failure" if failed else "Success",
+            "article_ids": article_ids,
+            "failed": failed,
+            "llm_cache": get_cache_stats()
+        })
+    }
+
+def handler(event, context):
+    """Lambda handler function"""
+    body = event if "article_id" in event else json.loads(event.get("body", "{}"))
+    
+    if body.get("mode") == "group":
+        return _handle_group(body)
+    
+    initial_state = _initial_state(body)
+    
+    print(f"🚀 STARTING ARTICLE {'REWRITE' if initial_state['mode'] == 'rewrite' else 'GENERATION'}")
+    
+    try:
+        if initial_state["mode"] == "rewrite":
+            run_async(_load_rewrite_research(initial_state))
         
-        if not result.get("final_content"):
-            raise Exception("No content was generated")
+        try:
+            result = run_async(run_workflow(initial_state))
+        finally:
+            run_async(flush_research_saves(initial_state['article_id']))
+        _check_result(result)
         
         print(f"✅ ARTICLE GENERATION COMPLETE")
+        if get_cache_stats():
+            print(f"💾 LLM cache stats: {get_cache_stats()}")
         
         finalize_article_in_db(
             result['article_id'], 
             result['final_content'], 
-            result['seo_brief']
+            result['seo_brief'],
+            save_brief=initial_state["mode"] != "rewrite"
         )
+        if Config.CHECKPOINT_DELETE_ON_SUCCESS:
+            run_async(clear_checkpoint(_thread_id(initial_state)))
         
         return {
             "statusCode": 200, 
             "body": json.dumps({
                 "message": "Success",
                 "article_id": result['article_id'],
-                "word_count": len(result['final_content'].split())
+                "word_count": len(result['final_content'].split()),
+                "llm_cache": get_cache_stats()
             })
         }
         
     except Exception as e:
-        error_msg = str(e)        
-        try:
-            from sqlalchemy import create_engine, text
-            from config import Config
-            engine = create_engine(Config.DB_URL)
-            with engine.connect() as conn:
-                conn.execute(text("""
-                    UPDATE articles 
-                    SET status = 'failed'
-                    WHERE id = :id
-                """), {"id": initial_state['article_id']})
-                conn.commit()
-        except:
-            pass
+        mark_articles_failed({initial_state['article_id']: str(e)}, initial_state["mode"])
         
         return {
             "statusCode": 500, 
             "body": json.dumps({
-                "error": error_msg,
+                "error": str(e),
                 "article_id": initial_state['article_id']
             })
-        }
\ No newline at end of file
+        }
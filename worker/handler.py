@@ -1,143 +1,184 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
-from graph import generate_article_workflow
-from db_sync import save_research_data, finalize_article_in_db
-from sqlalchemy import create_engine, text
+from browser_manager import run_async
+from checkpointing import clear_checkpoint
+from graph import generate_article_workflow, run_group
+from llm_cache import get_cache_stats
+from db_sync import FINISHED_STATUSES, claim_articles, finalize_article_in_db, mark_articles_failed
 from config import Config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def update_article_status(article_id: str, status: str, error_message: str = None):
-    """Update article status in database"""
-    engine = create_engine(Config.DB_URL)
+async def _finalize_group(body: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Grouped job: one research pass, one writer run per article (finalized by run_group)"""
+    article_ids = [item['article_id'] for item in body['articles']]
+    statuses = await asyncio.to_thread(claim_articles, article_ids)
+    
     try:
-        with engine.connect() as conn:
-            if error_message:
-                conn.execute(text("""
-                    UPDATE articles 
-                    SET status = :status, 
-                        error_message = :error,
-                        updated_at = NOW()
-                    WHERE id = :id
-                """), {"status": status, "error": error_message, "id": article_id})
-            else:
-                conn.execute(text("""
-                    UPDATE articles 
-                    SET status = :status,
-                        updated_at = NOW()
-                    WHERE id = :id
-                """), {"status": status, "id": article_id})
-            conn.commit()
-            logger.info(f"✅ Status updated: {article_id} -> {status}")
+        outcomes = await run_group(body, statuses=statuses)
     except Exception as e:
-        logger.error(f"Failed to update status: {e}")
+        logger.error(f"❌ Group research failed: {e}")
+        # Articles run_group skipped as already finished keep their status
+        pending = [a for a in article_ids if statuses.get(a) not in FINISHED_STATUSES]
+        await asyncio.to_thread(mark_articles_failed, {article_id: str(e) for article_id in pending})
+        return [a for a in article_ids if a not in pending], pending
+    
+    successful, failed = [], {}
+    for article_id, outcome in outcomes.items():
+        if isinstance(outcome, BaseException):
+            logger.error(f"❌ Generation failed: {article_id} - {outcome}")
+            failed[article_id] = str(outcome)
+        else:
+            successful.append(article_id)
+    await asyncio.to_thread(mark_articles_failed, failed)
+    return successful, list(failed)
+
+async def process_record(record: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    Processes one SQS record. Never raises; returns the article ids that
+    succeeded and failed ("unknown" when the message itself is unusable).
+    """
+    try:
+        # Parse message body
+        body = json.loads(record['body'])
+        article_id = body['article_id']
+        query = body['query']
+        category = body.get('category', 'General')
+        target_length = body.get('target_length', 1500)
+        source_count = body.get('source_count', 5)
+        mode = body.get('mode', 'generate')
+        
+        if mode == "group":
+            return await _finalize_group(body)
+        
+        # Moves the article to 'researching'; a redelivered message for an
+        # article that already finished must not regenerate it (rewrites
+        # always target a finished article, so they always run)
+        statuses = await asyncio.to_thread(claim_articles, [article_id])
+        if mode != "rewrite" and statuses.get(article_id) in FINISHED_STATUSES:
+            logger.info(f"⏭️ Article already {statuses[article_id]}, skipping: {article_id}")
+            return [article_id], []
+        
+        logger.info(f"🚀 Processing Article: {article_id}")
+        logger.info(f"   Query: {query}")
+        
+        # Run the article generation workflow
+        result = await generate_article_workflow(
+            article_id=article_id,
+            query=query,
+            category=category,
+            target_length=target_length,
+            source_count=source_count,
+            mode=mode,
+            tone=body.get('tone'),
+            interactive=body.get('interactive', False)
+        )
+        
+        if result.get('status') == 'success':
+            logger.info(f"✅ Article generated successfully: {article_id}")
+            
+            # Brief, content and final status in one transaction
+            await asyncio.to_thread(
+                finalize_article_in_db,
+                article_id=article_id,
+                content=result.get('content', ''),
+                seo_brief=result.get('seo_brief', {}),
+                save_brief=mode != "rewrite"
+            )
+            if Config.CHECKPOINT_DELETE_ON_SUCCESS:
+                await clear_checkpoint(result['thread_id'])
+            
+            return [article_id], []
+            
+        error_msg = result.get('error', 'Unknown error during generation')
+        logger.error(f"❌ Generation failed: {article_id} - {error_msg}")
+        await asyncio.to_thread(mark_articles_failed, {article_id: error_msg}, mode)
+        return [], [article_id]
+            
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in message: {e}")
+        return [], ["unknown"]
+        
+    except KeyError as e:
+        logger.error(f"Missing required field: {e}")
+        return [], ["unknown"]
+        
+    except Exception as e:
+        logger.error(f"Unexpected error processing message: {e}", exc_info=True)
+        
+        # Try to extract article_id for status update
+        try:
+            body = json.loads(record['body'])
+            article_id = body['article_id']
+            await asyncio.to_thread(mark_articles_failed, {article_id: str(e)}, body.get('mode', 'generate'))
+            return [], [article_id]
+        except:
+            return [], ["unknown"]
+
+async def process_records(records: List[Dict[str, Any]]) -> List[Tuple[List[str], List[str]]]:
+    """
+    Processes the batch concurrently, at most WORKER_RECORD_CONCURRENCY records
+    at a time. Shared resources are capped separately: browser pages by
+    BROWSER_MAX_PAGES and OpenAI requests by the graph's rate limiter.
+    """
+    semaphore = asyncio.Semaphore(Config.WORKER_RECORD_CONCURRENCY)
+    
+    async def bounded(record: Dict[str, Any]):
+        async with semaphore:
+            return await process_record(record)
+    
+    return await asyncio.gather(*(bounded(record) for record in records))
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler for processing SQS events.
-    Each event can contain multiple records (batched by SQS).
+    Each event can contain multiple records (batched by SQS); records are
+    processed concurrently in the worker's persistent event loop.
     
     Args:
         event: SQS event with Records array
         context: Lambda context object
     
     Returns:
-        Response with processing results
+        Partial batch response: batchItemFailures lists the messageIds to
+        retry, so successful messages are deleted and never regenerated.
+        Requires ReportBatchItemFailures on the SQS event source mapping.
     """
-    logger.info(f"📥 Received {len(event.get('Records', []))} messages")
+    records = event.get('Records', [])
+    logger.info(f"📥 Received {len(records)} messages")
     
     successful = []
     failed = []
+    batch_item_failures = []
     
-    for record in event.get('Records', []):
-        try:
-            # Parse message body
-            body = json.loads(record['body'])
-            article_id = body['article_id']
-            query = body['query']
-            category = body.get('category', 'General')
-            target_length = body.get('target_length', 1500)
-            source_count = body.get('source_count', 5)
-            
-            logger.info(f"🚀 Processing Article: {article_id}")
-            logger.info(f"   Query: {query}")
-            
-            # Update status to 'researching'
-            update_article_status(article_id, "researching")
-            
-            # Run the article generation workflow
-            result = generate_article_workflow(
-                article_id=article_id,
-                query=query,
-                category=category,
-                target_length=target_length,
-                source_count=source_count
-            )
-            
-            if result.get('status') == 'success':
-                logger.info(f"✅ Article generated successfully: {article_id}")
-                
-                # Update status to 'scraping'
-                update_article_status(article_id, "scraping")
-                
-                # Save research data
-                save_research_data(article_id, result.get('sources', []))
-                
-                # Update status to 'writing'
-                update_article_status(article_id, "writing")
-                
-                # Finalize article
-                finalize_article_in_db(
-                    article_id=article_id,
-                    content=result.get('content', ''),
-                    seo_brief=result.get('seo_brief', {})
-                )
-                
-                successful.append(article_id)
-                
-            else:
-                error_msg = result.get('error', 'Unknown error during generation')
-                logger.error(f"❌ Generation failed: {article_id} - {error_msg}")
-                update_article_status(article_id, "failed", error_msg)
-                failed.append(article_id)
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in message: {e}")
-            failed.append("unknown")
-            
-        except KeyError as e:
-            logger.error(f"Missing required field: {e}")
-            failed.append("unknown")
-            
-        except Exception as e:
-            logger.error(f"Unexpected error processing message: {e}", exc_info=True)
-            
-            # Try to extract article_id for status update
-            try:
-                body = json.loads(record['body'])
-                article_id = body['article_id']
-                update_article_status(article_id, "failed", str(e))
-                failed.append(article_id)
-            except:
-                failed.append("unknown")
+    for record, (ok, bad) in zip(records, run_async(process_records(records))):
+        successful.extend(ok)
+        failed.extend(bad)
+        if bad:
+            batch_item_failures.append({"itemIdentifier": record.get('messageId', '')})
     
     # Return processing summary
     response = {
+        "batchItemFailures": batch_item_failures,
         "statusCode": 200,
         "body": json.dumps({
-            "processed": len(event.get('Records', [])),
+            "processed": len(records),
             "successful": len(successful),
             "failed": len(failed),
             "successful_ids": successful,
-            "failed_ids": failed
+            "failed_ids": failed,
+            "llm_cache": get_cache_stats()
         })
     }
     
-    logger.info(f"📊 Batch Summary: {len(successful)} success, {len(failed)} failed")
+    logger.info(f"📊 Batch Summary: {len(successful)} success, {len(failed)} failed, {len(batch_item_failures)} messages to retry")
+    if get_cache_stats():
+        logger.info(f"💾 LLM cache stats: {get_cache_stats()}")
     
     return response
 
@@ -147,6 +188,7 @@ if __name__ == "__main__":
     test_event = {
         "Records": [
             {
+                "messageId": "test-message-1",
                 "body": json.dumps({
                     "article_id": "test-article-123",
                     "query": "AI trends in 2024",
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from config import Config
+from db_sync import get_engine
+
+logger = logging.getLogger(__name__)
+
+# key -> (expires_at, response text), most recently used last
+_memory: "OrderedDict[str, tuple]" = OrderedDict()
+_stats: Counter = Counter()
+_stores_since_prune = 0
+
+def cache_key(model: str, params: Dict, prompt: str) -> str:
+    """Content address of an LLM call: same model, parameters and prompt -> same key."""
+    payload = json.dumps({"model": model, "params": params, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def llm_params(llm) -> Dict:
+    return {"temperature": getattr(llm, "temperature", None), "max_tokens": getattr(llm, "max_tokens", None)}
+
+def is_enabled(node: str) -> bool:
+    return Config.LLM_CACHE_ENABLED and node in Config.LLM_CACHE_NODES
+
+def get_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters for this container, keyed '<node>.<event>'."""
+    return dict(_stats)
+
+# --- In-process LRU tier ---
+
+def _memory_get(key: str) -> Optional[str]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    expires_at, content = entry
+    if expires_at < time.time():
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return content
+
+def _memory_put(key: str, content: str):
+    _memory[key] = (time.time() + Config.LLM_CACHE_TTL, content)
+    _memory.move_to_end(key)
+    while len(_memory) > Config.LLM_CACHE_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+# --- Postgres tier ---
+
+def _db_get(key: str) -> Optional[str]:
+    try:
+        with get_engine().connect() as conn:
+            row = conn.execute(text("""
+                UPDATE llm_cache SET hits = hits + 1, last_hit_at = NOW()
+                WHERE cache_key = :key AND expires_at > NOW()
+                RETURNING response
+            """), {"key": key}).fetchone()
+            conn.commit()
+        return row.response if row else None
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache lookup failed: {e}")
+        return None
+
+def _db_put(key: str, model: str, node: str, content: str, prune: bool):
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("""
+                INSERT INTO llm_cache (cache_key, model, node, response, created_at, expires_at)
+                VALUES (:key, :model, :node, :response, NOW(), NOW() + make_interval(secs => :ttl))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response, created_at = NOW(), expires_at = EXCLUDED.expires_at
+            """), {"key": key, "model": model, "node": node, "response": content, "ttl": Config.LLM_CACHE_TTL})
+            if prune:
+                # TTL first, then keep only the most recently used rows
+                conn.execute(text("DELETE FROM llm_cache WHERE expires_at <= NOW()"))
+                conn.execute(text("""
+                    DELETE FROM llm_cache WHERE cache_key IN (
+                        SELECT cache_key FROM llm_cache
+                        ORDER BY COALESCE(last_hit_at, created_at) DESC
+                        OFFSET :max_rows
+                    )
+                """), {"max_rows": Config.LLM_CACHE_MAX_ROWS})
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache store failed: {e}")
+
+# --- Public API ---
+
+async def get_cached(key: str, node: str) -> Optional[str]:
+    content = _memory_get(key)
+    if content is not None:
+        _stats[f"{node}.memory_hits"] += 1
+        return content
+    content = await asyncio.to_thread(_db_get, key)
+    if content is not None:
+        _stats[f"{node}.db_hits"] += 1
+        _memory_put(key, content)
+        return content
+    _stats[f"{node}.misses"] += 1
+    return None
+
+async def put_cached(key: str, model: str, node: str, content: str):
+    global _stores_since_prune
+    _memory_put(key, content)
+    _stores_since_prune += 1
+    prune = _stores_since_prune >= Config.LLM_CACHE_PRUNE_EVERY
+    if prune:
+        _stores_since_prune = 0
+    _stats[f"{node}.stores"] += 1
+    await asyncio.to_thread(_db_put, key, model, node, content, prune)
+
+async def cached_ainvoke(llm, prompt: str, node: str, validate: Callable[[str], object] = None) -> str:
+    """
+    llm.ainvoke(prompt) returning the response text, served from the cache
+    when caching is enabled for this node. Only non-empty responses that pass
+    `validate` (if given, e.g. a JSON parser) are stored, so a bad reply is
+    not replayed on retry.
+    """
+    if not is_enabled(node):
+        response = await llm.ainvoke(prompt)
+        return response.content
+
+    key = cache_key(llm.model_name, llm_params(llm), prompt)
+    content = await get_cached(key, node)
+    if content is not None:
+        print(f"--- 💾 LLM cache hit ({node}) ---")
+        return content
+
+    response = await llm.ainvoke(prompt)
+    if response.content:
+        try:
+            if validate:
+                validate(response.content)
+        except Exception:
+            return response.content
+        await put_cached(key, llm.model_name, node, response.content)
+    return response.content
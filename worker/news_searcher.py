@@ -4,15 +4,23 @@ from gnews import GNews
 
 logger = logging.getLogger(__name__)
 
+# One client per result count, reused across searches in this container
+_clients = {}
+
+def _get_client(max_results: int) -> GNews:
+    if max_results not in _clients:
+        # English language, US country (configurable)
+        _clients[max_results] = GNews(language='en', country='US', max_results=max_results)
+    return _clients[max_results]
+
 class NewsSearcher:
     """
     Fetches articles using the GNews library (Google News RSS).
     """
 
-    def __init__(self, topic: str):
+    def __init__(self, topic: str, max_results: int = 5):
         self.topic = topic
-        # Initialize GNews: English language, US country (configurable)
-        self.google_news = GNews(language='en', country='US', max_results=5)
+        self.google_news = _get_client(max_results)
 
     def search(self) -> List[Dict]:
         """
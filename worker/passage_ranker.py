@@ -0,0 +1,159 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config import Config
+from context_budget import allocate_budget, count_tokens, truncate_to_tokens
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have",
+    "how", "in", "into", "is", "it", "its", "of", "on", "or", "that", "the", "their",
+    "this", "to", "was", "were", "what", "when", "where", "which", "who", "why", "will",
+    "with", "you", "your", "vs", "general"
+}
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+def split_passages(text: str, target_words: int = None) -> List[str]:
+    """
+    Splits extracted source text into passages of roughly target_words.
+    Paragraphs (blank-line separated) are kept whole where possible, headings
+    stay attached to the paragraph that follows them, and runs of short
+    paragraphs are merged.
+    """
+    target_words = target_words or Config.PASSAGE_TARGET_WORDS
+    passages = []
+    current = []
+    current_words = 0
+
+    def flush():
+        nonlocal current, current_words
+        if current:
+            passages.append("\n\n".join(current))
+        current, current_words = [], 0
+
+    for paragraph in (p.strip() for p in (text or "").split("\n\n")):
+        if not paragraph:
+            continue
+        words = paragraph.split()
+
+        # Very long paragraphs (or single-line page text) become word windows
+        if len(words) > target_words * 2:
+            flush()
+            for start in range(0, len(words), target_words):
+                passages.append(" ".join(words[start:start + target_words]))
+            continue
+
+        is_heading = paragraph.startswith("#")
+        if current_words + len(words) > target_words and current_words and not current[-1].startswith("#"):
+            flush()
+        current.append(paragraph)
+        current_words += len(words)
+        if current_words >= target_words and not is_heading:
+            flush()
+
+    flush()
+    return passages
+
+def bm25_scores(passages: List[List[str]], query: List[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Scores tokenized passages against a tokenized query with Okapi BM25.
+    Only query terms affect the score, so term frequencies are gathered into
+    a (passages x query terms) matrix and scored in one vectorized pass.
+    """
+    terms = sorted(set(query))
+    if not passages or not terms:
+        return np.zeros(len(passages))
+
+    index = {term: j for j, term in enumerate(terms)}
+    tf = np.zeros((len(passages), len(terms)), dtype=np.float32)
+    for i, tokens in enumerate(passages):
+        for token in tokens:
+            j = index.get(token)
+            if j is not None:
+                tf[i, j] += 1
+
+    lengths = np.array([len(tokens) for tokens in passages], dtype=np.float32)
+    avg_length = lengths.mean() or 1.0
+    doc_freq = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(passages) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    norm = k1 * (1 - b + b * lengths / avg_length)
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+def select_passages(
+    contents: List[str],
+    query: str,
+    model: str = "gpt-4o-mini",
+    total: int = None,
+    floor: int = None,
+    cap: int = None
+) -> Tuple[List[str], Dict]:
+    """
+    Keeps only the passages of each source that are relevant to the query,
+    within the analyzer input budget. Sources are budgeted by how much
+    relevant text they have (see context_budget.allocate_budget); each source
+    then gets its highest scoring passages, emitted in their original order.
+    """
+    total = total or Config.ANALYZER_INPUT_TOKEN_BUDGET
+    floor = floor or Config.ANALYZER_SOURCE_TOKEN_FLOOR
+    cap = cap or Config.ANALYZER_SOURCE_TOKEN_CAP
+
+    source_passages = [split_passages(content) for content in contents]
+    flat = [p for passages in source_passages for p in passages]
+    scores = bm25_scores([tokenize(p) for p in flat], tokenize(query))
+
+    # Regroup per source
+    per_source = []
+    offset = 0
+    for passages in source_passages:
+        per_source.append([
+            (scores[offset + i], i, passage, count_tokens(passage, model))
+            for i, passage in enumerate(passages)
+        ])
+        offset += len(passages)
+
+    # A source's useful size is its relevant text; the lead passage always counts
+    useful = [
+        sum(tokens for score, i, _, tokens in scored if score > 0 or i == 0)
+        for scored in per_source
+    ]
+    allocation = allocate_budget(useful, total, floor, cap)
+
+    selected_texts = []
+    kept, available, used = [], [], []
+    for scored, budget in zip(per_source, allocation):
+        chosen, spent = [], 0
+        for score, i, passage, tokens in sorted(scored, key=lambda s: (-s[0], s[1])):
+            if score <= 0 and i != 0:
+                break
+            if spent + tokens > budget:
+                continue
+            chosen.append((i, passage))
+            spent += tokens
+        # Never leave a budgeted source empty just because its best passage is too big
+        if not chosen and scored and budget > 0:
+            score, i, passage, tokens = max(scored, key=lambda s: (s[0], -s[1]))
+            passage = truncate_to_tokens(passage, budget, model)
+            chosen.append((i, passage))
+            spent = min(tokens, budget)
+        chosen.sort()
+        selected_texts.append("\n\n".join(passage for _, passage in chosen))
+        kept.append(len(chosen))
+        available.append(len(scored))
+        used.append(spent)
+
+    meta = {
+        "input_token_budget": total,
+        "selection": "bm25",
+        "source_tokens_available": [sum(t for *_, t in scored) for scored in per_source],
+        "source_tokens_allocated": allocation,
+        "source_tokens_used": sum(used),
+        "passages_kept": kept,
+        "passages_total": available,
+    }
+    return selected_texts, meta
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from config import Config
+from db_sync import get_engine
+
+logger = logging.getLogger(__name__)
+
+class LocalQuotaStore:
+    """
+    In-process stand-in for the shared store (local runs, or QUOTA_BACKEND=local).
+    Same semantics as PostgresQuotaStore, but only this container is counted.
+    """
+
+    def __init__(self):
+        self._rows = {}  # (provider, day) -> [used, tokens, refilled_at]
+
+    def claim(self, provider: str, day: str, block: int, limit: int):
+        now = time.time()
+        row = self._rows.setdefault((provider, day), [0, float(Config.QUOTA_BURST), now])
+        used, tokens, refilled_at = row
+        tokens = min(Config.QUOTA_BURST, tokens + Config.QUOTA_RATE_PER_SECOND * (now - refilled_at))
+        granted = max(0, min(block, limit - used, int(tokens)))
+        self._rows[(provider, day)] = [used + granted, tokens - granted, now]
+        return granted, used + granted >= limit, tokens - granted
+
+    def exhaust(self, provider: str, day: str, limit: int):
+        row = self._rows.setdefault((provider, day), [0, 0.0, time.time()])
+        row[0] = max(row[0], limit)
+
+class PostgresQuotaStore:
+    """
+    Daily quota and token bucket shared by every container, one api_quota row
+    per provider and day. A claim refills the bucket, grants up to `block`
+    calls and records them in a single locked statement.
+    """
+
+    def claim(self, provider: str, day: str, block: int, limit: int):
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                INSERT INTO api_quota (provider, day, used, tokens, refilled_at)
+                VALUES (:provider, CAST(:day AS date), 0, :burst, NOW())
+                ON CONFLICT (provider, day) DO NOTHING
+            """), {"provider": provider, "day": day, "burst": Config.QUOTA_BURST})
+            row = conn.execute(text("""
+                WITH current AS (
+                    SELECT used,
+                           LEAST(:burst, tokens + :rate * EXTRACT(EPOCH FROM NOW() - refilled_at)) AS tokens
+                    FROM api_quota
+                    WHERE provider = :provider AND day = CAST(:day AS date)
+                    FOR UPDATE
+                ), grant_ AS (
+                    SELECT used, tokens,
+                           GREATEST(0, LEAST(:block, :limit - used, FLOOR(tokens)::int)) AS granted
+                    FROM current
+                )
+                UPDATE api_quota
+                SET used = grant_.used + grant_.granted,
+                    tokens = grant_.tokens - grant_.granted,
+                    refilled_at = NOW()
+                FROM grant_
+                WHERE provider = :provider AND day = CAST(:day AS date)
+                RETURNING grant_.granted AS granted, api_quota.used AS used, api_quota.tokens AS tokens
+            """), {
+                "provider": provider,
+                "day": day,
+                "block": block,
+                "limit": limit,
+                "burst": Config.QUOTA_BURST,
+                "rate": Config.QUOTA_RATE_PER_SECOND
+            }).fetchone()
+        return row.granted, row.used >= limit, float(row.tokens)
+
+    def exhaust(self, provider: str, day: str, limit: int):
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                INSERT INTO api_quota (provider, day, used, tokens, refilled_at)
+                VALUES (:provider, CAST(:day AS date), :limit, 0, NOW())
+                ON CONFLICT (provider, day) DO UPDATE
+                SET used = GREATEST(api_quota.used, EXCLUDED.used)
+            """), {"provider": provider, "day": day, "limit": limit})
+
+_local_store = LocalQuotaStore()
+_store = None
+# provider -> {"day": quota day, "remaining": leased calls not yet used, "exhausted": bool}
+_leases = {}
+_lock = None
+_lock_loop = None
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = PostgresQuotaStore() if Config.QUOTA_BACKEND == "postgres" else _local_store
+    return _store
+
+def _get_lock() -> asyncio.Lock:
+    global _lock, _lock_loop
+    loop = asyncio.get_running_loop()
+    if _lock is None or _lock_loop is not loop:
+        _lock = asyncio.Lock()
+        _lock_loop = loop
+    return _lock
+
+def _quota_day() -> str:
+    """Provider quotas reset at midnight in QUOTA_TIMEZONE (Pacific for Google APIs)."""
+    return datetime.now(ZoneInfo(Config.QUOTA_TIMEZONE)).date().isoformat()
+
+def _lease(provider: str, day: str) -> dict:
+    lease = _leases.get(provider)
+    if lease is None or lease["day"] != day:
+        # New day: unused calls from yesterday's block are gone with the old row
+        lease = _leases[provider] = {"day": day, "remaining": 0, "exhausted": False}
+    return lease
+
+async def _claim(provider: str, day: str, limit: int):
+    try:
+        return await asyncio.to_thread(_get_store().claim, provider, day, Config.QUOTA_LEASE_BLOCK, limit)
+    except Exception as e:
+        # Keep searching on this container's own count rather than not at all
+        logger.warning(f"⚠️ Shared quota unavailable, counting locally: {e}")
+        return _local_store.claim(provider, day, Config.QUOTA_LEASE_BLOCK, limit)
+
+async def acquire_quota(provider: str, limit: int) -> bool:
+    """
+    Takes one call from the provider's shared daily quota. Calls are served
+    from a block leased by this container, so the shared store is only
+    contacted once every QUOTA_LEASE_BLOCK calls. When the shared token bucket
+    is empty, waits up to QUOTA_MAX_WAIT for a refill. Returns False once the
+    day's quota is used up (or the wait runs out).
+    """
+    deadline = time.monotonic() + Config.QUOTA_MAX_WAIT
+    async with _get_lock():
+        while True:
+            day = _quota_day()
+            lease = _lease(provider, day)
+            if lease["remaining"] > 0:
+                lease["remaining"] -= 1
+                return True
+            if lease["exhausted"]:
+                return False
+
+            granted, exhausted, tokens = await _claim(provider, day, limit)
+            lease["remaining"] += granted
+            lease["exhausted"] = exhausted
+            if granted:
+                continue
+            if exhausted:
+                logger.warning(f"⛔ Daily {provider} quota reached ({limit}). Search locked.")
+                return False
+
+            # Rate limited: sleep until the bucket holds a whole token
+            wait = (1 - tokens) / Config.QUOTA_RATE_PER_SECOND if Config.QUOTA_RATE_PER_SECOND > 0 else None
+            if wait is None or time.monotonic() + wait > deadline:
+                logger.warning(f"⏳ {provider} rate limit reached, skipping this call")
+                return False
+            await asyncio.sleep(wait)
+
+async def mark_quota_exhausted(provider: str, limit: int):
+    """The provider rejected a call for quota (HTTP 429): stop every container for the day."""
+    day = _quota_day()
+    _lease(provider, day).update(remaining=0, exhausted=True)
+    try:
+        await asyncio.to_thread(_get_store().exhaust, provider, day, limit)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record exhausted {provider} quota: {e}")
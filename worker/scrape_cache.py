@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from sqlalchemy import text
+
+from config import Config
+from db_sync import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "mc_cid", "mc_eid", "igshid", "_ga"}
+# Google News adds locale/tracking params to otherwise identical article links
+GOOGLE_NEWS_PARAMS = {"oc", "hl", "gl", "ceid"}
+
+# URL hash -> Future of the scrape result, for pipelines in this container
+_inflight = {}
+_stores_since_prune = 0
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for cache lookups: lowercases scheme/host, drops 'www.',
+    default ports, fragments, trailing slashes and tracking parameters, and
+    sorts the remaining query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    netloc = host
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    dropped = TRACKING_PARAMS | (GOOGLE_NEWS_PARAMS if host == "news.google.com" else set())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in dropped
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+# --- Local tier (/tmp survives across warm invocations of the same container) ---
+
+def _local_path(key: str) -> str:
+    return os.path.join(Config.SCRAPE_CACHE_DIR, f"{key}.json")
+
+def _read_local(key: str):
+    path = _local_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("fetched_at", 0) > Config.SCRAPE_CACHE_TTL:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    return entry["result"]
+
+def _write_local(key: str, result: dict, fetched_at: float = None):
+    try:
+        os.makedirs(Config.SCRAPE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{_local_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at or time.time(), "result": result}, f, ensure_ascii=False)
+        os.replace(tmp_path, _local_path(key))
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write local scrape cache: {e}")
+
+# --- Shared tier (Postgres) ---
+
+def _db_lookup(keys: list) -> dict:
+    """Returns {url_hash: (result, fetched_at_epoch)} for fresh entries."""
+    if not keys:
+        return {}
+    try:
+        with get_engine().connect() as conn:
+            rows = conn.execute(text("""
+                SELECT url_hash, result, EXTRACT(EPOCH FROM fetched_at) AS fetched_at
+                FROM scrape_cache
+                WHERE url_hash = ANY(:keys)
+                  AND status = 'ready'
+                  AND fetched_at > NOW() - make_interval(secs => :ttl)
+            """), {"keys": keys, "ttl": Config.SCRAPE_CACHE_TTL}).fetchall()
+        return {row.url_hash: (json.loads(row.result), float(row.fetched_at)) for row in rows}
+    except Exception as e:
+        logger.warning(f"⚠️ Scrape cache lookup failed: {e}")
+        return {}
+
+def _db_claim(entries: dict) -> list:
+    """
+    Takes a fetch lease for each {url_hash: url}. Returns the hashes we now own;
+    the others are being fetched by another container right now.
+    """
+    if not entries:
+        return []
+    claimed = []
+    try:
+        with get_engine().connect() as conn:
+            for key, url in entries.items():
+                row = conn.execute(text("""
+                    INSERT INTO scrape_cache (url_hash, url, status, lease_until)
+                    VALUES (:key, :url, 'pending', NOW() + make_interval(secs => :lease))
+                    ON CONFLICT (url_hash) DO UPDATE
+                    SET status = 'pending', lease_until = EXCLUDED.lease_until
+                    WHERE (scrape_cache.status = 'pending' AND scrape_cache.lease_until < NOW())
+                       OR (scrape_cache.status = 'ready'
+                           AND scrape_cache.fetched_at <= NOW() - make_interval(secs => :ttl))
+                    RETURNING url_hash
+                """), {
+                    "key": key,
+                    "url": normalize_url(url),
+                    "lease": Config.SCRAPE_CACHE_LEASE_SECONDS,
+                    "ttl": Config.SCRAPE_CACHE_TTL
+                }).fetchone()
+                if row:
+                    claimed.append(key)
+            conn.commit()
+        return claimed
+    except Exception as e:
+        # Without the shared tier every URL is ours to fetch
+        logger.warning(f"⚠️ Scrape cache lease failed: {e}")
+        return list(entries)
+
+def _db_store(entries: dict, failed_keys: list, prune: bool = False):
+    """
+    Stores successful results and releases leases for failed fetches; with
+    prune, also drops expired pages and leases nobody released.
+    """
+    try:
+        with get_engine().connect() as conn:
+            if entries:
+                conn.execute(text("""
+                    INSERT INTO scrape_cache (url_hash, url, result, status, fetched_at, lease_until)
+                    VALUES (:key, :url, :result, 'ready', NOW(), NULL)
+                    ON CONFLICT (url_hash) DO UPDATE
+                    SET url = EXCLUDED.url,
+                        result = EXCLUDED.result,
+                        status = 'ready',
+                        fetched_at = NOW(),
+                        lease_until = NULL
+                """), [
+                    {"key": key, "url": normalize_url(result["url"]), "result": json.dumps(result)}
+                    for key, result in entries.items()
+                ])
+            if failed_keys:
+                conn.execute(text("""
+                    DELETE FROM scrape_cache
+                    WHERE url_hash = ANY(:keys) AND status = 'pending'
+                """), {"keys": failed_keys})
+            if prune:
+                conn.execute(text("""
+                    DELETE FROM scrape_cache
+                    WHERE (status = 'ready' AND fetched_at < NOW() - make_interval(secs => :ttl))
+                       OR (status = 'pending' AND lease_until < NOW())
+                """), {"ttl": Config.SCRAPE_CACHE_TTL})
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Scrape cache store failed: {e}")
+
+async def _wait_for_other_containers(keys: list) -> dict:
+    """Polls the shared tier until other containers finish their leased fetches."""
+    found = {}
+    deadline = time.monotonic() + Config.SCRAPE_CACHE_LEASE_SECONDS
+    pending = list(keys)
+    while pending and time.monotonic() < deadline:
+        await asyncio.sleep(Config.SCRAPE_CACHE_POLL_INTERVAL)
+        ready = await asyncio.to_thread(_db_lookup, pending)
+        found.update(ready)
+        pending = [k for k in pending if k not in ready]
+    return found
+
+# --- Public API ---
+
+async def _fetch_and_store(keys: list, urls: dict, scrape_fn) -> dict:
+    global _stores_since_prune
+    scraped = await scrape_fn([urls[k] for k in keys])
+    fresh, failed = {}, []
+    for key, result in zip(keys, scraped):
+        if result.get("status") == "success":
+            fresh[key] = result
+            _write_local(key, result)
+        else:
+            failed.append(key)
+    _stores_since_prune += len(fresh)
+    prune = _stores_since_prune >= Config.SCRAPE_CACHE_PRUNE_EVERY
+    if prune:
+        _stores_since_prune = 0
+    await asyncio.to_thread(_db_store, fresh, failed, prune)
+    return dict(zip(keys, scraped))
+
+async def scrape_with_cache(urls: list, scrape_fn) -> list:
+    """
+    Returns scrape results for urls (in input order), serving them from the
+    local /tmp tier or the shared Postgres tier when fresh. Misses are fetched
+    with scrape_fn(urls). Concurrent requests for the same URL are coalesced:
+    within this container through in-flight futures, across containers through
+    a short fetch lease in Postgres.
+    """
+    if not Config.SCRAPE_CACHE_ENABLED or not urls:
+        return await scrape_fn(urls)
+
+    keys = [cache_key(url) for url in urls]
+    cached = {}
+
+    # Tier 1: local
+    for key in set(keys):
+        result = _read_local(key)
+        if result:
+            cached[key] = result
+
+    # Tier 2: shared
+    missing = list({k for k in keys if k not in cached})
+    for key, (result, fetched_at) in (await asyncio.to_thread(_db_lookup, missing)).items():
+        cached[key] = result
+        _write_local(key, result, fetched_at)
+
+    print(f"--- 💾 Scrape cache: {sum(k in cached for k in keys)}/{len(urls)} hits ---")
+
+    # Coalesce the misses
+    loop = asyncio.get_running_loop()
+    owned = {}
+    waiting = {}
+    for key, url in zip(keys, urls):
+        if key in cached or key in waiting:
+            continue
+        if key in _inflight:
+            waiting[key] = _inflight[key]
+        else:
+            future = loop.create_future()
+            _inflight[key] = future
+            waiting[key] = future
+            owned[key] = url
+
+    try:
+        fetched = {}
+        if owned:
+            claimed = await asyncio.to_thread(_db_claim, owned)
+            if claimed:
+                fetched.update(await _fetch_and_store(claimed, owned, scrape_fn))
+
+            leased_elsewhere = [k for k in owned if k not in claimed]
+            if leased_elsewhere:
+                print(f"  - Waiting on {len(leased_elsewhere)} URLs being scraped by another worker")
+                ready = await _wait_for_other_containers(leased_elsewhere)
+                for key, (result, fetched_at) in ready.items():
+                    fetched[key] = result
+                    _write_local(key, result, fetched_at)
+
+                leftovers = [k for k in leased_elsewhere if k not in ready]
+                if leftovers:
+                    fetched.update(await _fetch_and_store(leftovers, owned, scrape_fn))
+
+        for key in owned:
+            waiting[key].set_result(fetched.get(key))
+    finally:
+        for key in owned:
+            if not waiting[key].done():
+                waiting[key].set_result(None)
+            _inflight.pop(key, None)
+
+    results = []
+    for key, url in zip(keys, urls):
+        result = cached.get(key) if key in cached else await waiting[key]
+        if result:
+            results.append({**result, "url": url, "cache_hit": key in cached})
+        else:
+            results.append({
+                "url": url,
+                "content": "",
+                "status": "failed",
+                "error": "Coalesced scrape failed"
+            })
+    return results
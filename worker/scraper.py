@@ -3,128 +3,291 @@ import sys
 import json
 import os
 
-from playwright.async_api import async_playwright
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
 
-from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
+from browser_manager import BrowserManager, browser_manager, run_async
+from config import Config
+from content_extractor import extract_main_content
+from gnews_resolver import resolve_google_news_urls, remember_redirects
+from http_fetcher import fetch_urls_http
 
-async def scrape_urls(urls: list, headless: bool = True, output_file: str = "scraped_data.json"):
+def _needs_browser(url: str) -> bool:
+    """Unresolved Google News article links only reach the publisher via JavaScript."""
+    return "news.google.com" in url
+
+# Third-party hosts that only serve ads, analytics or tracking
+TRACKER_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "hotjar.com",
+    "taboola.com",
+    "outbrain.com",
+    "amazon-adsystem.com",
+    "criteo.com",
+    "chartbeat.com",
+    "newrelic.com",
+    "segment.io",
+)
+
+# Any of these with enough text means the article body has rendered
+CONTENT_SELECTOR = "article, main, [role='main'], [itemprop='articleBody']"
+
+READINESS_SCRIPT = """(selector) => {
+    const body = document.body;
+    const content = document.querySelector(selector);
+    return {
+        text: body ? body.textContent.length : 0,
+        content: content ? content.textContent.length : 0
+    };
+}"""
+
+async def _block_unneeded_resources(route):
+    """Aborts requests that never contribute text (images, media, fonts, trackers)."""
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if request.resource_type in Config.SCRAPE_BLOCKED_RESOURCE_TYPES or host.endswith(TRACKER_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def _wait_until_ready(page):
     """
-    Scrapes a list of URLs using LangChain for navigation and Native Playwright for extraction.
-    Fixes 'ERR_ABORTED' by forcing a real User-Agent globally.
+    Returns once the page is ready to read: a content container holds enough
+    text, or the body text has stopped growing for SCRAPE_READY_STABLE_MS.
+    Gives up after SCRAPE_READY_MAX_MS and reads whatever is there.
     """
-    results = []
-    
-    print(f"Initializing Hybrid Scraper (Headless: {headless})...")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + Config.SCRAPE_READY_MAX_MS / 1000
+    stable_for = Config.SCRAPE_READY_STABLE_MS / 1000
+    last_length = -1
+    stable_since = loop.time()
+
+    while loop.time() < deadline:
+        try:
+            state = await page.evaluate(READINESS_SCRIPT, CONTENT_SELECTOR)
+        except Exception:
+            # Page is mid-navigation (e.g. a redirect); try again
+            state = None
+
+        if state:
+            if state["content"] >= Config.SCRAPE_READY_CONTENT_CHARS:
+                return
+            if state["text"] != last_length:
+                last_length = state["text"]
+                stable_since = loop.time()
+            elif last_length > 0 and loop.time() - stable_since >= stable_for:
+                return
+
+        await asyncio.sleep(0.25)
+
+async def _read_page_content(page, url: str) -> dict:
+    """
+    Waits for Google News redirects on an already navigated page, waits until
+    the text has rendered and extracts the main content into a scrape result.
+    """
+    if "google.com" in page.url:
+        print("  - Waiting for redirect (up to 15s)...")
+        try:
+            for _ in range(30): # 30 * 0.5s = 15s
+                if "google.com" not in page.url:
+                    break
+                await asyncio.sleep(0.5)
+            
+            print(f"  - Current URL: {page.url}")
+        except Exception as e:
+            print(f"  - Redirect warning: {e}")
+
+    await _wait_until_ready(page)
+
+    try:
+        content = await page.inner_text("body")
+    except Exception:
+        # Fallback: If inner_text fails (rare), try raw JS as last resort
+        try:
+            content = await page.evaluate("document.body.innerText")
+        except:
+            content = ""
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=headless,
-            args=[
-                "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "--disable-blink-features=AutomationControlled",
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu",
-                "--disable-web-security", 
-                "--disable-features=IsolateOrigins,site-per-process",
-                "--ignore-certificate-errors"
-            ]
-        )
+    # Python-side cleaning
+    if content:
+        cleaned_content = " ".join(content.split())
+    else:
+        cleaned_content = ""
         
-        # 2. Initialize the Toolkit
-        toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
-        tools = toolkit.get_tools()
-        
-        # Get the navigation tool
-        navigate_tool = next((t for t in tools if t.name == "navigate_browser"), None)
-        
-        if not navigate_tool:
-            print("Error: Could not find navigate_tool in PlayWrightBrowserToolkit.")
-            return []
+    # Final check for empty/failed scraping
+    if not cleaned_content or len(cleaned_content) < 200:
+         status = "possible_block_or_empty"
+         error_msg = f"Content length low ({len(cleaned_content)} chars). URL might be blocked or empty."
+    else:
+        status = "success"
+        error_msg = None
+
+    # Keep only the main article text (headings + paragraphs) for the analyzer
+    if status == "success":
+        try:
+            html = await page.content()
+            # CPU-bound on large pages, keep it off the shared event loop
+            main_content = await asyncio.to_thread(extract_main_content, html, cleaned_content)
+        except Exception as e:
+            print(f"  - Main content extraction failed: {e}")
+            main_content = cleaned_content
+    else:
+        main_content = cleaned_content
+
+    return {
+        "url": url, 
+        "final_url": page.url,
+        "content": main_content,
+        "raw_length": len(cleaned_content),
+        "status": status,
+        "error": error_msg
+    }
 
+async def _scrape_with_page_pool(manager: BrowserManager, urls: list, concurrency: int, url_timeout: int) -> list:
+    """
+    Scrapes URLs using a bounded pool of isolated browser contexts borrowed from the manager.
+    Each URL gets a fresh page inside a pooled context and is capped by url_timeout.
+    Results are returned in the same order as the input URLs.
+    """
+    pool = asyncio.Queue()
+
+    async def scrape_one(url: str) -> dict:
+        # Wait for this job's own context before taking a global page slot,
+        # so queued URLs don't hold slots other records could use
+        context = await pool.get()
+        try:
+            async with manager.page_slot():
+                return await _scrape_in_context(context, url)
+        finally:
+            pool.put_nowait(context)
+
+    async def _scrape_in_context(context, url: str) -> dict:
+        page = None
         try:
-            for url in urls:
+            print(f"Scraping: {url}")
+            page = await context.new_page()
+
+            async def navigate_and_read():
+                # Readiness is decided by _wait_until_ready, not the 'load' event
+                await page.goto(url, wait_until="domcontentloaded")
+                return await _read_page_content(page, url)
+
+            return await asyncio.wait_for(navigate_and_read(), timeout=url_timeout)
+        except asyncio.TimeoutError:
+            print(f"Timeout processing {url} after {url_timeout}s")
+            return {
+                "url": url,
+                "error": f"Timed out after {url_timeout}s",
+                "status": "failed"
+            }
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+            return {
+                "url": url, 
+                "error": str(e),
+                "status": "failed"
+            }
+        finally:
+            if page:
                 try:
-                    print(f"Scraping: {url}")
-                    
-                    await navigate_tool.arun({"url": url})
-                    
-                    page = None
-                    if browser.contexts and browser.contexts[0].pages:
-                        page = browser.contexts[0].pages[0]
-                    
-                    if page:
-                        if "google.com" in page.url:
-                            print("  - Waiting for redirect (up to 15s)...")
-                            try:
-                                for _ in range(30): # 30 * 0.5s = 15s
-                                    if "google.com" not in page.url:
-                                        break
-                                    await asyncio.sleep(0.5)
-                                
-                                print(f"  - Current URL: {page.url}")
-                                
-                                try:
-                                    await page.wait_for_load_state("domcontentloaded", timeout=15000)
-                                except:
-                                    pass 
-                                
-                                await page.wait_for_timeout(3000) 
-                            except Exception as e:
-                                print(f"  - Redirect warning: {e}")
-
-                        # robustness: ensure body exists
-                        try:
-                            await page.wait_for_selector("body", timeout=5000)
-                        except:
-                            pass 
-
-                        try:
-                            content = await page.inner_text("body")
-                        except Exception:
-                            # Fallback: If inner_text fails (rare), try raw JS as last resort
-                            try:
-                                content = await page.evaluate("document.body.innerText")
-                            except:
-                                content = ""
-                        
-                        # Python-side cleaning
-                        if content:
-                            cleaned_content = " ".join(content.split())
-                        else:
-                            cleaned_content = ""
-                            
-                        # Final check for empty/failed scraping
-                        if not cleaned_content or len(cleaned_content) < 200:
-                             status = "possible_block_or_empty"
-                             error_msg = f"Content length low ({len(cleaned_content)} chars). URL might be blocked or empty."
-                        else:
-                            status = "success"
-                            error_msg = None
-                    else:
-                        content = ""
-                        status = "failed"
-                        error_msg = "Could not access active page in browser context"
-
-                    results.append({
-                        "url": url, 
-                        "content": cleaned_content,
-                        "status": status,
-                        "error": error_msg
-                    })
-                    
-                except Exception as e:
-                    print(f"Error processing {url}: {e}")
-                    results.append({
-                        "url": url, 
-                        "error": str(e),
-                        "status": "failed"
-                    })
-                    
+                    await page.close()
+                except Exception:
+                    pass
+
+    async with AsyncExitStack() as stack:
+        for _ in range(min(concurrency, len(urls))):
+            context = await stack.enter_async_context(manager.context())
+            if Config.SCRAPE_BLOCK_RESOURCES:
+                await context.route("**/*", _block_unneeded_resources)
+            pool.put_nowait(context)
+        return list(await asyncio.gather(*(scrape_one(url) for url in urls)))
+
+async def scrape_urls(
+    urls: list,
+    headless: bool = True,
+    output_file: str = "scraped_data.json",
+    concurrency: int = None,
+    url_timeout: int = None
+):
+    """
+    Scrapes a list of URLs with a tiered fetcher. Each URL is first tried with a
+    plain HTTP GET; only empty, blocked or too-short results escalate to Playwright,
+    which uses contexts from the shared browser manager.
+
+    Browser URLs are scraped in parallel on a bounded pool of browser contexts
+    (see Config.SCRAPE_CONCURRENCY / Config.SCRAPE_URL_TIMEOUT; 1 = sequential).
+    Results always come back in input order.
+    """
+    concurrency = concurrency or Config.SCRAPE_CONCURRENCY
+    url_timeout = url_timeout or Config.SCRAPE_URL_TIMEOUT
+    
+    if not urls:
+        return []
+
+    print(f"Initializing Scraper (Headless: {headless}, Concurrency: {concurrency})...")
+    
+    results = [None] * len(urls)
+
+    # Resolve Google News links to publisher URLs without a browser where possible,
+    # so they can take the HTTP tier and skip the redirect wait
+    targets = list(urls)
+    if Config.GNEWS_RESOLVER_ENABLED:
+        resolved = await resolve_google_news_urls(urls)
+        targets = [resolved.get(url, url) for url in urls]
+
+    # Tier 1: plain HTTP for server-rendered pages. Unresolved Google News links
+    # need a JS redirect, so they always go to the browser.
+    if Config.HTTP_FETCH_ENABLED:
+        http_indexes = [i for i, target in enumerate(targets) if not _needs_browser(target)]
+        if http_indexes:
+            http_results = await fetch_urls_http([targets[i] for i in http_indexes])
+            for i, result in zip(http_indexes, http_results):
+                if result["status"] == "success":
+                    result["fetched_via"] = "http"
+                    results[i] = result
+                else:
+                    print(f"  - HTTP tier escalating {targets[i]}: {result.get('error')}")
+            print(f"HTTP tier: {sum(r is not None for r in results)}/{len(http_indexes)} URLs fetched without a browser")
+
+    # Tier 2: Playwright only for what HTTP could not handle
+    browser_indexes = [i for i, result in enumerate(results) if result is None]
+    if browser_indexes:
+        # Headed runs are for local debugging only and get a throwaway browser
+        manager = browser_manager if headless else BrowserManager(headless=False)
+        try:
+            browser_results = await _scrape_with_page_pool(
+                manager, [targets[i] for i in browser_indexes], concurrency, url_timeout
+            )
         finally:
-            print("Closing browser...")
-            # Browser context closes automatically when exiting 'async with'
+            if manager is not browser_manager:
+                await manager.close()
+        for i, result in zip(browser_indexes, browser_results):
+            result["fetched_via"] = "browser"
+            results[i] = result
+
+        # Keep redirects the browser had to follow so the next lookup is instant
+        learned = {
+            urls[i]: results[i].get("final_url")
+            for i in browser_indexes
+            if _needs_browser(targets[i]) and results[i].get("final_url")
+        }
+        if learned:
+            await remember_redirects(learned)
+
+    # Results are keyed by the URL the caller asked for
+    for url, target, result in zip(urls, targets, results):
+        result["url"] = url
+        if target != url:
+            result["resolved_url"] = target
     
     # # 4. Save results to JSON file
     # if output_file:
@@ -148,7 +311,7 @@ if __name__ == "__main__":
     print("Starting Hybrid LangChain Scraper...")
     
     try:
-        data = asyncio.run(scrape_urls(test_urls, headless=True, output_file="scraped_data.json"))
+        data = run_async(scrape_urls(test_urls, headless=True, output_file="scraped_data.json"))
         
         print("\n" + "="*50)
         print(f"Process finished.")
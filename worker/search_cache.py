@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from config import Config
+from db_sync import get_engine
+
+logger = logging.getLogger(__name__)
+
+# key -> (expires_at, results), most recently used last
+_memory: "OrderedDict[str, tuple]" = OrderedDict()
+_stores_since_prune = 0
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and spacing don't change what a search returns, so they don't change the key."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = PUNCTUATION_RE.sub(" ", query)
+    return WHITESPACE_RE.sub(" ", query).strip()
+
+def cache_key(provider: str, query: str, max_results: int) -> str:
+    payload = json.dumps([provider, max_results, normalize_query(query)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_enabled(provider: str) -> bool:
+    return Config.SEARCH_CACHE_ENABLED and Config.SEARCH_CACHE_TTLS.get(provider, 0) > 0
+
+# --- In-process LRU tier ---
+
+def _memory_get(key: str) -> Optional[List[Dict]]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    expires_at, results = entry
+    if expires_at < time.time():
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return results
+
+def _memory_put(key: str, results: List[Dict], expires_at: float):
+    _memory[key] = (expires_at, results)
+    _memory.move_to_end(key)
+    while len(_memory) > Config.SEARCH_CACHE_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+# --- Postgres tier ---
+
+def _db_get(key: str):
+    """Returns (results, expires_at epoch) for a fresh entry, or None."""
+    try:
+        with get_engine().connect() as conn:
+            row = conn.execute(text("""
+                UPDATE search_cache SET hits = hits + 1
+                WHERE cache_key = :key AND expires_at > NOW()
+                RETURNING results, EXTRACT(EPOCH FROM expires_at) AS expires_at
+            """), {"key": key}).fetchone()
+            conn.commit()
+        return (json.loads(row.results), float(row.expires_at)) if row else None
+    except Exception as e:
+        logger.warning(f"⚠️ Search cache lookup failed: {e}")
+        return None
+
+def _db_put(key: str, provider: str, query: str, results: List[Dict], ttl: int, prune: bool):
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("""
+                INSERT INTO search_cache (cache_key, provider, query, results, created_at, expires_at)
+                VALUES (:key, :provider, :query, :results, NOW(), NOW() + make_interval(secs => :ttl))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET results = EXCLUDED.results, created_at = NOW(), expires_at = EXCLUDED.expires_at
+            """), {
+                "key": key,
+                "provider": provider,
+                "query": normalize_query(query),
+                "results": json.dumps(results, ensure_ascii=False),
+                "ttl": ttl
+            })
+            if prune:
+                conn.execute(text("DELETE FROM search_cache WHERE expires_at <= NOW()"))
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Search cache store failed: {e}")
+
+# --- Public API ---
+
+async def get_cached(provider: str, query: str, max_results: int) -> Optional[List[Dict]]:
+    """Fresh cached results for this provider and query, or None."""
+    key = cache_key(provider, query, max_results)
+    results = _memory_get(key)
+    if results is None:
+        entry = await asyncio.to_thread(_db_get, key)
+        if entry is None:
+            return None
+        results, expires_at = entry
+        _memory_put(key, results, expires_at)
+    # The pipeline adds scraped content to result dicts, keep the cached ones clean
+    return [dict(result) for result in results]
+
+async def put_cached(provider: str, query: str, max_results: int, results: List[Dict]):
+    global _stores_since_prune
+    key = cache_key(provider, query, max_results)
+    ttl = Config.SEARCH_CACHE_TTLS[provider]
+    _memory_put(key, [dict(result) for result in results], time.time() + ttl)
+    _stores_since_prune += 1
+    prune = _stores_since_prune >= Config.SEARCH_CACHE_PRUNE_EVERY
+    if prune:
+        _stores_since_prune = 0
+    await asyncio.to_thread(_db_put, key, provider, query, results, ttl, prune)
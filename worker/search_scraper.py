@@ -1,6 +1,8 @@
 import logging
 from typing import List
-from playwright.async_api import async_playwright
+from urllib.parse import quote_plus
+
+from browser_manager import browser_manager
 
 logger = logging.getLogger(__name__)
 
@@ -17,22 +19,8 @@ class GoogleSearchScraper:
         Performs a Google search using a headless browser and extracts result URLs.
         """
         urls = []
-        async with async_playwright() as p:
-            # Launch browser with arguments to reduce bot detection
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-gpu"
-                ]
-            )
-            
-            # Create a context with a realistic user agent
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
-            
+        # Borrow a context from the shared, already running browser
+        async with browser_manager.page_slot(), browser_manager.context() as context:
             page = await context.new_page()
 
             try:
@@ -40,7 +28,7 @@ class GoogleSearchScraper:
                 
                 # Construct Google Search URL (hl=en ensures English results)
                 # We request slightly more results than needed to account for ads/filtering
-                search_url = f"https://www.google.com/search?q={self.query}&num={num_results + 3}&hl=en"
+                search_url = f"https://www.google.com/search?q={quote_plus(self.query)}&num={num_results + 3}&hl=en"
                 
                 await page.goto(search_url, timeout=15000, wait_until="domcontentloaded")
                 
@@ -80,7 +68,5 @@ class GoogleSearchScraper:
                 
             except Exception as e:
                 logger.error(f"❌ Google Scraping Failed: {e}")
-            finally:
-                await browser.close()
                 
         return urls
\ No newline at end of file
@@ -1,56 +1,170 @@
+import asyncio
 import logging
-import requests
-from typing import List, Dict
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
 from datetime import datetime
-from langchain.tools import tool
-from gnews import GNews
 from config import Config
+from http_fetcher import get_http_client
+from news_searcher import NewsSearcher
+from quota import acquire_quota, mark_quota_exhausted
+from scrape_cache import normalize_url
+from search_cache import get_cached, is_enabled, put_cached
+from search_scraper import GoogleSearchScraper
 
 logger = logging.getLogger(__name__)
 
-# Global counter for API usage
-API_USAGE_COUNTER = 0
+# Per-container totals, keyed '<provider>.<event>'
+_stats: Counter = Counter()
 
-@tool
-def search_tool(query: str) -> List[Dict]:
+# "Headline - Publisher" (Google News) vs "Headline | Publisher"
+TITLE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]+$")
+
+# --- Providers: async (query, max_results) -> standardized results ---
+
+async def _search_gnews(query: str, max_results: int) -> List[Dict]:
+    # GNews is synchronous, keep it off the event loop
+    results = await asyncio.to_thread(NewsSearcher(query, max_results=max_results).search)
+    return [_standardize_result(item, source_type="Google News") for item in results[:max_results]]
+
+async def _search_cse(query: str, max_results: int) -> List[Dict]:
+    # Every request counts against the daily quota, whatever it returns
+    if not await acquire_quota("cse", Config.DAILY_API_LIMIT):
+        return []
+
+    api_results = await _google_api_search(query, max_results)
+    if api_results:
+        logger.info(f"✅ Found {len(api_results)} results via API.")
+    return api_results
+
+async def _search_google_scrape(query: str, max_results: int) -> List[Dict]:
+    urls = await GoogleSearchScraper(query).search(num_results=max_results)
+    return [_standardize_result({"link": url, "title": url}, source_type="Google Search", is_api=True) for url in urls]
+
+PROVIDERS = {
+    "gnews": _search_gnews,
+    "cse": _search_cse,
+    "google_scrape": _search_google_scrape,
+}
+
+def get_search_stats() -> Dict[str, int]:
+    """Provider counters for this container, keyed '<provider>.<event>'."""
+    return dict(_stats)
+
+async def _run_provider(name: str, query: str, max_results: int) -> Tuple[List[Dict], Dict]:
     """
-    Searches for a topic using Google News first. 
-    If no news is found, it falls back to the Google Custom Search API.
-    Returns standardized articles with 'source_origin' tag.
+    Runs one provider (or serves it from the search cache), never raising;
+    returns its results and a stats record.
     """
-    global API_USAGE_COUNTER
-    
-    # --- STEP 1: Try Google News ---
-    logger.info(f"🕵️  Checking Google News for: {query}")
+    started = time.monotonic()
     try:
-        google_news = GNews(language='en', country='US', max_results=5)
-        results = google_news.get_news(query)
-        
-        if results:
-            logger.info(f"✅ Found {len(results)} results on Google News.")
-            # Tag as Google News
-            return [_standardize_result(item, source_type="Google News") for item in results[:5]]
+        results = await get_cached(name, query, max_results) if is_enabled(name) else None
+        if results is not None:
+            status = "cached"
+        else:
+            results = await asyncio.wait_for(PROVIDERS[name](query, max_results), Config.SEARCH_PROVIDER_TIMEOUT)
+            status = "ok" if results else "empty"
+            # Failures and empty answers are retried live next time
+            if results and is_enabled(name):
+                await put_cached(name, query, max_results, results)
+    except asyncio.TimeoutError:
+        results, status = [], "timeout"
     except Exception as e:
-        logger.error(f"⚠️ Google News failed: {e}")
+        logger.error(f"❌ Search provider {name} failed: {e}")
+        results, status = [], "error"
+    latency_ms = int((time.monotonic() - started) * 1000)
+    _stats[f"{name}.{status}"] += 1
+    _stats[f"{name}.results"] += len(results)
+    _stats[f"{name}.latency_ms"] += latency_ms
+    return results, {"provider": name, "status": status, "latency_ms": latency_ms, "results": len(results)}
 
-    # --- STEP 2: Fallback to Google API ---
-    logger.info("⚠️ No news found (or error). Switching to Google Custom Search API...")
-    
-    if API_USAGE_COUNTER >= Config.DAILY_API_LIMIT:
-        logger.warning(f"⛔ API Limit Reached ({API_USAGE_COUNTER}/{Config.DAILY_API_LIMIT}). Search locked.")
-        return []
+def _dedupe_keys(result: Dict) -> List[str]:
+    keys = [f"url:{normalize_url(result['url'])}"]
+    title = TITLE_SUFFIX_RE.sub("", result.get("title") or "").strip().lower()
+    if len(title) > 20:
+        keys.append(f"title:{title}")
+    return keys
 
-    api_results = _google_api_search(query)
-    
-    if api_results:
-        API_USAGE_COUNTER += 1
-        logger.info(f"✅ Found {len(api_results)} results via API. (Usage: {API_USAGE_COUNTER}/{Config.DAILY_API_LIMIT})")
-        return api_results
-        
-    logger.warning("❌ No results found in News or Search API.")
-    return []
-
-def _google_api_search(query: str):
+def _merge_results(runs: Dict[str, Tuple[List[Dict], Dict]], order: List[str]) -> List[Dict]:
+    """Merges provider results in priority order, dropping repeats of the same URL or headline."""
+    seen = set()
+    merged = []
+    for name in order:
+        if name not in runs:
+            continue
+        results, stats = runs[name]
+        stats["new_results"] = 0
+        for result in results:
+            if not result.get("url"):
+                continue
+            keys = _dedupe_keys(result)
+            if any(key in seen for key in keys):
+                continue
+            seen.update(keys)
+            merged.append(result)
+            stats["new_results"] += 1
+    return merged
+
+async def search_sources(query: str, min_results: int = 5, strategy: str = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Searches every configured provider according to SEARCH_STRATEGY and
+    returns (merged results in provider priority order, per-provider stats).
+    Sequential only moves on when every provider so far found nothing, so
+    quota-counted providers like cse stay a fallback. Hedge stops starting
+    providers once the results cover min_results, and also starts the next
+    one when the running ones take longer than SEARCH_HEDGE_DELAY.
+    """
+    strategy = strategy or Config.SEARCH_STRATEGY
+    order = [name for name in Config.SEARCH_PROVIDERS if name in PROVIDERS]
+    per_provider = max(Config.SEARCH_RESULTS_PER_PROVIDER, min_results)
+    logger.info(f"🕵️  Searching {', '.join(order)} ({strategy}) for: {query}")
+
+    runs = {}
+    tasks = {}  # running provider task -> provider name
+    remaining = list(order)
+    start_now = len(remaining) if strategy == "fanout" else 1
+    hedge_delay = Config.SEARCH_HEDGE_DELAY if strategy == "hedge" else None
+
+    try:
+        while remaining or tasks:
+            for name in remaining[:start_now]:
+                tasks[asyncio.create_task(_run_provider(name, query, per_provider))] = name
+            remaining = remaining[start_now:]
+            start_now = 0
+            if not tasks:
+                break
+
+            done, _ = await asyncio.wait(
+                tasks,
+                timeout=hedge_delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                runs[tasks.pop(task)] = task.result()
+
+            found = len(_merge_results(runs, order))
+            if (found and strategy == "sequential") or (found >= min_results and strategy != "fanout"):
+                break
+            if not done or not tasks:
+                # Hedge delay passed, or everything started so far has finished short
+                start_now = 1
+    finally:
+        # Providers still running once enough results arrived
+        for task, name in tasks.items():
+            task.cancel()
+            _stats[f"{name}.cancelled"] += 1
+            runs[name] = ([], {"provider": name, "status": "cancelled", "latency_ms": None, "results": 0})
+
+    merged = _merge_results(runs, order)
+    stats = [runs[name][1] for name in order if name in runs]
+    summary = ", ".join(f"{s['provider']}: {s['status']} {s['results']}" for s in stats)
+    logger.info(f"✅ {len(merged)} unique results ({summary})")
+    if not merged:
+        logger.warning("❌ No results found from any search provider.")
+    return merged, stats
+
+async def _google_api_search(query: str, max_results: int = 5):
     if not Config.GOOGLE_API_KEY or not Config.GOOGLE_CSE_ID:
         logger.error("❌ Missing GOOGLE_API_KEY or GOOGLE_CSE_ID.")
         return []
@@ -60,17 +174,25 @@ def _google_api_search(query: str):
         "key": Config.GOOGLE_API_KEY,
         "cx": Config.GOOGLE_CSE_ID,
         "q": query,
-        "num": 5
+        "num": min(max_results, 10)  # API maximum
     }
 
     try:
-        resp = requests.get(url, params=params)
+        resp = await get_http_client().get(url, params=params)
+        if resp.status_code == 429:
+            # Per-minute limits clear on their own, the daily quota doesn't
+            if "per day" in resp.text.lower():
+                logger.warning("⛔ Google API daily quota exceeded (429). Search locked for today.")
+                await mark_quota_exhausted("cse", Config.DAILY_API_LIMIT)
+            else:
+                logger.warning("⛔ Google API rate limited (429).")
+            return []
         resp.raise_for_status()
         data = resp.json()
-        
+
         if "items" not in data:
             return []
-            
+
         return [_standardize_result(item, source_type="Google Custom Search", is_api=True) for item in data["items"]]
 
     except Exception as e:
@@ -85,8 +207,8 @@ def _standardize_result(item, source_type, is_api=False):
         published_date = "Unknown"
         if "pagemap" in item and "metatags" in item["pagemap"]:
             metatags = item["pagemap"]["metatags"][0]
-            published_date = metatags.get("article:published_time", 
-                             metatags.get("date", 
+            published_date = metatags.get("article:published_time",
+                             metatags.get("date",
                              datetime.now().strftime("%Y-%m-%d")))
 
         return {
@@ -108,4 +230,4 @@ def _standardize_result(item, source_type, is_api=False):
             "publisher": item.get("publisher", {}),
             "published date": item.get("published date"),
             "source_origin": source_type # <--- Added this
-        }
\ No newline at end of file
+        }
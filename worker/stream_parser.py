@@ -0,0 +1,101 @@
+import json
+import logging
+import re
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+OUTLINE_KEY_RE = re.compile(r'"detailed_outline"\s*:\s*\[')
+# The brief lists its keywords (an array of strings) before the outline
+KEYWORDS_RE = re.compile(r'"keywords"\s*:\s*(\[(?:[^\]"]|"(?:[^"\\]|\\.)*")*\])')
+
+class OutlineStreamParser:
+    """
+    Incrementally scans a streamed analyzer reply and returns each element of
+    the "detailed_outline" array as soon as its closing brace arrives, so
+    section writers can start before the rest of the brief is generated.
+    The keywords array that precedes the outline is picked up too, so those
+    writers get the brief's keywords. Only these parts are parsed here; the
+    complete reply is still parsed with json.loads once the stream ends.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0              # next character to scan
+        self.in_outline = False
+        self.done = False
+        self.depth = 0            # nesting depth inside the outline array
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.sections: List[Dict] = []
+        self.keywords: List[str] = []
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Adds a chunk of streamed text and returns the outline sections it completed."""
+        self.buffer += chunk
+        completed = []
+        if self.done:
+            return completed
+
+        if not self.in_outline:
+            if not self.keywords:
+                self._parse_keywords()
+            match = OUTLINE_KEY_RE.search(self.buffer, max(0, self.pos - 32))
+            if not match:
+                self.pos = len(self.buffer)
+                return completed
+            self.in_outline = True
+            self.pos = match.end()
+
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            char = buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    # End of the outline array itself
+                    self.done = True
+                    self.pos += 1
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.item_start is not None:
+                    section = self._parse_item(buffer[self.item_start:self.pos + 1])
+                    if section is not None:
+                        self.sections.append(section)
+                        completed.append(section)
+                    self.item_start = None
+            self.pos += 1
+        return completed
+
+    def _parse_keywords(self):
+        match = KEYWORDS_RE.search(self.buffer)
+        if not match:
+            return
+        try:
+            keywords = json.loads(match.group(1))
+        except json.JSONDecodeError as e:
+            logger.debug(f"Skipping unparseable keywords: {e}")
+            return
+        self.keywords = [k for k in keywords if isinstance(k, str)]
+
+    @staticmethod
+    def _parse_item(raw: str):
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Skipping unparseable outline section: {e}")
+            return None
+        return item if isinstance(item, dict) else None